@@ -117,7 +117,7 @@ Security Notes:
     parser.add_argument(
         '--integrity',
         action='store_true',
-        help='Enable log integrity checks (HMAC)'
+        help='Enable log integrity checks (signed records)'
     )
     
     args = parser.parse_args()
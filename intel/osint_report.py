@@ -12,6 +12,7 @@ Features:
 """
 
 import json
+import heapq
 from datetime import datetime
 from typing import TYPE_CHECKING
 from pathlib import Path
@@ -116,10 +117,10 @@ class OSINTReport:
             key = f"{p.asn} ({p.asn_description[:30]}...)" if len(p.asn_description) > 30 else f"{p.asn} ({p.asn_description})"
             asns[key] = asns.get(key, 0) + 1
         
-        # Top offenders
-        top_by_traffic = sorted(profiles, key=lambda x: x.total_bytes, reverse=True)[:10]
-        top_by_throttle = sorted(profiles, key=lambda x: x.throttled_packets, reverse=True)[:10]
-        top_by_score = sorted(profiles, key=lambda x: x.threat_score, reverse=True)[:10]
+        # Top offenders (partial selection, no full sort)
+        top_by_traffic = heapq.nlargest(10, profiles, key=lambda x: x.total_bytes)
+        top_by_throttle = heapq.nlargest(10, profiles, key=lambda x: x.throttled_packets)
+        top_by_score = heapq.nlargest(10, profiles, key=lambda x: x.threat_score)
         
         return {
             "summary": {
@@ -128,17 +129,13 @@ class OSINTReport:
                 "medium_risk_count": len(medium_risk_ips),
             },
             
-            "geographic_distribution": dict(sorted(
-                countries.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )[:20]),
+            "geographic_distribution": dict(heapq.nlargest(
+                20, countries.items(), key=lambda x: x[1]
+            )),
             
-            "asn_distribution": dict(sorted(
-                asns.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:20]),
+            "asn_distribution": dict(heapq.nlargest(
+                20, asns.items(), key=lambda x: x[1]
+            )),
             
             "top_offenders": {
                 "by_traffic": [self._short_profile(p) for p in top_by_traffic],
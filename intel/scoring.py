@@ -7,7 +7,8 @@ Security Fixes:
   - #4: Uses externalized country list from config
 """
 
-from typing import TYPE_CHECKING
+import re
+from typing import TYPE_CHECKING, Optional
 import logging
 
 if TYPE_CHECKING:
@@ -27,6 +28,12 @@ class ThreatScorer:
         self.high_risk_countries = config.high_risk_countries
         self.suspicious_asn_keywords = config.suspicious_asn_keywords
         
+        # All ASN keywords in one alternation: one C-level scan rejects
+        # the common no-match description without a Python loop
+        self._asn_pattern = re.compile(
+            "|".join(re.escape(k) for k in self.suspicious_asn_keywords)
+        ) if self.suspicious_asn_keywords else None
+        
         # Score weights (could also be in config)
         self.score_high_risk_country = 30
         self.score_extreme_speed = 40
@@ -69,19 +76,34 @@ class ThreatScorer:
                 score += self.score_high_throttle
                 reasons.append(f"High throttle ratio: {throttle_ratio:.0%}")
         
-        # 4. Suspicious ASN (Fix #4: from config)
-        asn_lower = profile.asn_description.lower()
-        for keyword in self.suspicious_asn_keywords:
-            if keyword in asn_lower:
-                score += self.score_suspicious_asn
-                reasons.append(f"Suspicious ASN keyword: {keyword}")
-                break  # Only count once
+        # 4. Suspicious ASN (Fix #4: from config) — only count once
+        keyword = self._match_asn(profile.asn_description)
+        if keyword:
+            score += self.score_suspicious_asn
+            reasons.append(f"Suspicious ASN keyword: {keyword}")
         
         # Cap at 100
         final_score = min(score, 100)
         
         return final_score, reasons
     
+    def _match_asn(self, asn_description: str) -> Optional[str]:
+        """
+        Find first suspicious keyword (in keyword-list order) in ASN description.
+        
+        The regex only decides whether any keyword is present; the reported
+        keyword is the first in list order, not the first in the text.
+        """
+        if self._asn_pattern is None:
+            return None
+        asn_lower = asn_description.lower()
+        if not self._asn_pattern.search(asn_lower):
+            return None
+        for keyword in self.suspicious_asn_keywords:
+            if keyword in asn_lower:
+                return keyword
+        return None
+    
     def update_profile_score(self, profile: "IPProfile"):
         """Update profile with calculated score."""
         score, reasons = self.calculate(profile)
@@ -14,15 +14,15 @@ import time
 import ipaddress
 import logging
 from queue import Queue, Empty
-from threading import Thread, Lock, RLock
-from datetime import datetime
+from threading import Thread, Lock
 from typing import Optional, TYPE_CHECKING
 from collections import OrderedDict
+from functools import lru_cache
 
 if TYPE_CHECKING:
     from ..config import NetShieldConfig
 
-from ..models import IPProfile
+from ..models import IPProfile, iso_now_cached
 from .scoring import ThreatScorer
 
 logger = logging.getLogger(__name__)
@@ -37,6 +37,21 @@ except ImportError:
     logger.warning("ipwhois not installed. WHOIS functions disabled.")
 
 
+@lru_cache(maxsize=65536)
+def _is_private_ip(ip: str) -> bool:
+    """
+    Check if IP is private or invalid.
+    
+    Pure function of the string, memoized: hot source IPs repeat on
+    every packet and ipaddress parsing is comparatively slow.
+    """
+    try:
+        addr = ipaddress.ip_address(ip)
+        return addr.is_private or addr.is_loopback or addr.is_reserved
+    except ValueError:
+        return True
+
+
 class RateLimiter:
     """
     Token bucket rate limiter for WHOIS requests.
@@ -51,10 +66,16 @@ class RateLimiter:
         self.lock = Lock()
     
     def acquire(self, timeout: float = 1.0) -> bool:
-        """Try to acquire a token. Returns True if allowed."""
+        """
+        Try to acquire a token. Returns True if allowed.
+        
+        Refill is lazy (computed at acquire time). When empty, sleeps
+        exactly until the next token is due instead of polling; if that
+        is past the deadline, waits out the timeout and returns False.
+        """
         deadline = time.monotonic() + timeout
         
-        while time.monotonic() < deadline:
+        while True:
             with self.lock:
                 now = time.monotonic()
                 elapsed = now - self.last_update
@@ -65,72 +86,125 @@ class RateLimiter:
                 if self.tokens >= 1.0:
                     self.tokens -= 1.0
                     return True
+                
+                wait = ((1.0 - self.tokens) / self.rate
+                        if self.rate > 0 else float('inf'))
             
-            time.sleep(0.05)
-        
-        return False
+            remaining = deadline - now
+            if remaining <= 0:
+                return False
+            if wait > remaining:
+                time.sleep(remaining)
+                return False
+            
+            time.sleep(wait)
 
 
-class LRUCache:
-    """
-    Thread-safe LRU cache with max size and TTL.
+class _CacheShard:
+    """One LRU partition: its own OrderedDict, lock and capacity."""
     
-    Security Fix #2: Prevents memory exhaustion DoS.
-    """
+    __slots__ = ('max_size', 'ttl_seconds', 'cache', 'lock')
     
-    def __init__(self, max_size: int = 50000, ttl_hours: int = 24):
+    def __init__(self, max_size: int, ttl_seconds: int):
         self.max_size = max_size
-        self.ttl_seconds = ttl_hours * 3600
-        self._cache: OrderedDict[str, IPProfile] = OrderedDict()
-        self._lock = RLock()
+        self.ttl_seconds = ttl_seconds
+        self.cache: OrderedDict[str, IPProfile] = OrderedDict()
+        self.lock = Lock()
     
     def get(self, key: str) -> Optional[IPProfile]:
-        """Get item, updating access order."""
-        with self._lock:
-            if key not in self._cache:
+        with self.lock:
+            profile = self.cache.get(key)
+            if profile is None:
                 return None
             
-            profile = self._cache[key]
-            
             # Check TTL
             now = time.monotonic()
             if now - profile.last_access > self.ttl_seconds:
-                del self._cache[key]
+                del self.cache[key]
                 return None
             
             # Move to end (most recent)
-            self._cache.move_to_end(key)
+            self.cache.move_to_end(key)
             profile.last_access = now
             
             return profile
     
     def put(self, key: str, value: IPProfile):
-        """Add item, evicting LRU if at capacity."""
-        with self._lock:
+        with self.lock:
             value.last_access = time.monotonic()
             
-            if key in self._cache:
-                self._cache.move_to_end(key)
-                self._cache[key] = value
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.cache[key] = value
             else:
                 # Evict LRU if at capacity
-                while len(self._cache) >= self.max_size:
-                    self._cache.popitem(last=False)
+                while len(self.cache) >= self.max_size:
+                    self.cache.popitem(last=False)
                 
-                self._cache[key] = value
+                self.cache[key] = value
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with max size and TTL.
+    
+    Security Fix #2: Prevents memory exhaustion DoS.
+    
+    Large caches are striped into up to MAX_SHARDS partitions, each with
+    its own lock, so concurrent lookups of different IPs don't serialize.
+    LRU order is per shard; capacities sum exactly to max_size. Small
+    caches use a single shard (exact global LRU).
+    """
+    
+    MAX_SHARDS = 16
+    MIN_SHARD_SIZE = 1024
+    
+    def __init__(self, max_size: int = 50000, ttl_hours: int = 24):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_hours * 3600
+        
+        n_shards = 1
+        while (n_shards < self.MAX_SHARDS
+               and max_size // (n_shards * 2) >= self.MIN_SHARD_SIZE):
+            n_shards *= 2
+        
+        base, extra = divmod(max_size, n_shards)
+        self._shards = [
+            _CacheShard(base + (1 if i < extra else 0), self.ttl_seconds)
+            for i in range(n_shards)
+        ]
+        self._mask = n_shards - 1
+    
+    def _shard(self, key: str) -> _CacheShard:
+        return self._shards[hash(key) & self._mask]
+    
+    def get(self, key: str) -> Optional[IPProfile]:
+        """Get item, updating access order."""
+        return self._shard(key).get(key)
+    
+    def put(self, key: str, value: IPProfile):
+        """Add item, evicting LRU if at capacity."""
+        self._shard(key).put(key, value)
     
     def __contains__(self, key: str) -> bool:
-        with self._lock:
-            return key in self._cache
+        shard = self._shard(key)
+        with shard.lock:
+            return key in shard.cache
     
     def values(self) -> list[IPProfile]:
         """Return all values (snapshot)."""
-        with self._lock:
-            return list(self._cache.values())
+        result = []
+        for shard in self._shards:
+            with shard.lock:
+                result.extend(shard.cache.values())
+        return result
     
     def __len__(self) -> int:
-        with self._lock:
-            return len(self._cache)
+        total = 0
+        for shard in self._shards:
+            with shard.lock:
+                total += len(shard.cache)
+        return total
 
 
 class ThreatIntel:
@@ -173,14 +247,6 @@ class ThreatIntel:
         else:
             self.worker_thread = None
     
-    def _is_private_ip(self, ip: str) -> bool:
-        """Check if IP is private or invalid."""
-        try:
-            addr = ipaddress.ip_address(ip)
-            return addr.is_private or addr.is_loopback or addr.is_reserved
-        except ValueError:
-            return True
-    
     def _lookup_worker(self):
         """
         Background worker for WHOIS lookups.
@@ -260,17 +326,17 @@ class ThreatIntel:
     
     def get_or_create_profile(self, ip: str) -> Optional[IPProfile]:
         """Get existing profile or create new one."""
-        if self._is_private_ip(ip):
+        if _is_private_ip(ip):
             return None
         
         # Check cache first
         profile = self.cache.get(ip)
         if profile is not None:
-            profile.last_seen = datetime.now().isoformat()
+            profile.last_seen = iso_now_cached()
             return profile
         
         # Create new profile
-        now = datetime.now().isoformat()
+        now = iso_now_cached()
         profile = IPProfile(
             ip=ip,
             first_seen=now,
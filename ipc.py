@@ -27,6 +27,7 @@ Security:
 """
 
 import json
+import socket
 import struct
 import logging
 import threading
@@ -49,6 +50,13 @@ except ImportError:
     WIN32_AVAILABLE = False
     logger.warning("pywin32 not installed. IPC will not work.")
 
+# Optional orjson for the remaining JSON messages (Command, StatsResponse)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 
 # =============================================================================
 # CONSTANTS
@@ -63,6 +71,60 @@ MAX_PACKET_SIZE = 65535
 HEADER_FORMAT = '>I'  # Big-endian unsigned int
 HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
 
+# PacketData wire layout (after the length header): version, src_port,
+# dst_port, protocol, flags, size, timestamp, src_ip, dst_ip. IPs are
+# 16-byte inet_pton buffers; IPv4 uses the first 4 bytes + a flag bit.
+PACKET_FORMAT = '!BHHBBIq16s16s'
+PACKET_VERSION = 1
+PACKET_SIZE = struct.calcsize(PACKET_FORMAT)
+_PACKET_STRUCT = struct.Struct(PACKET_FORMAT)
+# Header + body in one Struct: a frame is packed in a single call, no concat
+_FRAME_STRUCT = struct.Struct(HEADER_FORMAT + PACKET_FORMAT[1:])
+FRAME_SIZE = _FRAME_STRUCT.size
+
+_PROTO_CODES = {"tcp": 0, "udp": 1}
+_PROTO_NAMES = ("tcp", "udp")
+_PROTO_UNKNOWN = 255
+
+_FLAG_SRC_V4 = 0x01
+_FLAG_DST_V4 = 0x02
+_FLAG_INBOUND = 0x04
+
+
+def _pack_ip(ip: str) -> tuple[bytes, bool]:
+    """IP string -> (16-byte buffer, is_ipv4)."""
+    try:
+        if ':' in ip:
+            return socket.inet_pton(socket.AF_INET6, ip), False
+        return socket.inet_pton(socket.AF_INET, ip), True
+    except OSError as e:
+        raise ValueError(f"Unpackable IP: {ip!r}") from e
+
+
+def _unpack_ip(buf: bytes, is_v4: bool) -> str:
+    """16-byte buffer -> IP string."""
+    if is_v4:
+        return socket.inet_ntop(socket.AF_INET, buf[:4])
+    return socket.inet_ntop(socket.AF_INET6, buf)
+
+
+def _json_dumps(obj: dict) -> bytes:
+    """Compact UTF-8 JSON."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(data: bytes) -> Any:
+    """Parse UTF-8 JSON; raises ValueError on bad input either way."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+
+# Characters allowed in an IPv4/IPv6 address string
+IP_CHARS = frozenset("0123456789abcdefABCDEF:.")
+
 
 # =============================================================================
 # DATA MODELS (Type-safe, validated)
@@ -76,7 +138,12 @@ class CommandType(str, Enum):
     SHUTDOWN = "shutdown"
 
 
-@dataclass
+# Whitelists as frozensets: one hash probe per validate()
+VALID_COMMAND_TYPES = frozenset(c.value for c in CommandType)
+VALID_PROTOCOLS = frozenset(("tcp", "udp"))
+
+
+@dataclass(slots=True)
 class PacketData:
     """
     Packet information sent from service to worker.
@@ -90,20 +157,76 @@ class PacketData:
     dst_port: int
     protocol: str  # "tcp" or "udp"
     size: int
-    timestamp: float
+    timestamp: int  # time.monotonic_ns() at capture
     
     # Metadata
     is_inbound: bool = True
     
     def to_bytes(self) -> bytes:
-        """Serialize to bytes for IPC."""
-        data = json.dumps(asdict(self), separators=(',', ':')).encode('utf-8')
-        return struct.pack(HEADER_FORMAT, len(data)) + data
+        """
+        Serialize to bytes for IPC.
+        
+        Fixed binary layout (PACKET_FORMAT), no JSON: this runs once per
+        forwarded packet. Header and body are packed together.
+        """
+        try:
+            return _FRAME_STRUCT.pack(*self._frame_fields())
+        except struct.error as e:
+            raise ValueError(f"Unpackable packet: {e}") from e
+    
+    def pack_into(self, buffer: bytearray, offset: int) -> None:
+        """
+        Write this packet's frame (FRAME_SIZE bytes) into buffer at offset.
+        
+        Raises ValueError like to_bytes; the slot may then hold a partial
+        frame, so callers must reuse or trim it.
+        """
+        try:
+            _FRAME_STRUCT.pack_into(buffer, offset, *self._frame_fields())
+        except struct.error as e:
+            raise ValueError(f"Unpackable packet: {e}") from e
+    
+    def _frame_fields(self) -> tuple:
+        """Field values for _FRAME_STRUCT (length header first)."""
+        src, src_v4 = _pack_ip(self.src_ip)
+        dst, dst_v4 = _pack_ip(self.dst_ip)
+        flags = ((_FLAG_SRC_V4 if src_v4 else 0)
+                 | (_FLAG_DST_V4 if dst_v4 else 0)
+                 | (_FLAG_INBOUND if self.is_inbound else 0))
+        
+        return (
+            PACKET_SIZE, PACKET_VERSION, self.src_port, self.dst_port,
+            _PROTO_CODES.get(self.protocol, _PROTO_UNKNOWN), flags,
+            self.size, int(self.timestamp), src, dst
+        )
     
     @classmethod
     def from_bytes(cls, data: bytes) -> 'PacketData':
-        """Deserialize from bytes."""
-        return cls(**json.loads(data.decode('utf-8')))
+        """
+        Deserialize from bytes.
+        
+        Raises ValueError on a short frame or unknown version. Unknown
+        protocol codes decode to "unknown" so validate() rejects them.
+        """
+        if len(data) != PACKET_SIZE:
+            raise ValueError(f"Bad packet frame length: {len(data)}")
+        
+        (version, src_port, dst_port, proto, flags,
+         size, timestamp, src, dst) = _PACKET_STRUCT.unpack(data)
+        
+        if version != PACKET_VERSION:
+            raise ValueError(f"Unsupported packet version: {version}")
+        
+        return cls(
+            src_ip=_unpack_ip(src, flags & _FLAG_SRC_V4),
+            dst_ip=_unpack_ip(dst, flags & _FLAG_DST_V4),
+            src_port=src_port,
+            dst_port=dst_port,
+            protocol=_PROTO_NAMES[proto] if proto < len(_PROTO_NAMES) else "unknown",
+            size=size,
+            timestamp=timestamp,
+            is_inbound=bool(flags & _FLAG_INBOUND),
+        )
     
     def validate(self) -> bool:
         """Validate packet data — prevent injection."""
@@ -121,7 +244,7 @@ class PacketData:
         if not (0 <= self.size <= MAX_PACKET_SIZE):
             return False
         # Protocol validation
-        if self.protocol not in ("tcp", "udp"):
+        if self.protocol not in VALID_PROTOCOLS:
             return False
         return True
     
@@ -131,11 +254,10 @@ class PacketData:
         if not ip or len(ip) > 45:
             return False
         # Only allow valid IP characters
-        import re
-        return bool(re.match(r'^[\d.:a-fA-F]+$', ip))
+        return IP_CHARS.issuperset(ip)
 
 
-@dataclass
+@dataclass(slots=True)
 class Command:
     """
     Command sent from worker to service.
@@ -149,20 +271,18 @@ class Command:
     
     def to_bytes(self) -> bytes:
         """Serialize to bytes for IPC."""
-        data = json.dumps(asdict(self), separators=(',', ':')).encode('utf-8')
+        data = _json_dumps(asdict(self))
         return struct.pack(HEADER_FORMAT, len(data)) + data
     
     @classmethod
     def from_bytes(cls, data: bytes) -> 'Command':
         """Deserialize from bytes."""
-        return cls(**json.loads(data.decode('utf-8')))
+        return cls(**_json_loads(data))
     
     def validate(self) -> bool:
         """Validate command — security check."""
         # Check command type against whitelist
-        try:
-            CommandType(self.type)
-        except ValueError:
+        if not isinstance(self.type, str) or self.type not in VALID_COMMAND_TYPES:
             logger.warning(f"Invalid command type: {self.type}")
             return False
         
@@ -175,7 +295,7 @@ class Command:
         return True
 
 
-@dataclass
+@dataclass(slots=True)
 class StatsResponse:
     """Statistics response from service."""
     total_packets: int = 0
@@ -183,14 +303,15 @@ class StatsResponse:
     throttled_packets: int = 0
     throttled_ips: list = field(default_factory=list)
     uptime_seconds: float = 0.0
+    ipc_overflow: int = 0
     
     def to_bytes(self) -> bytes:
-        data = json.dumps(asdict(self), separators=(',', ':')).encode('utf-8')
+        data = _json_dumps(asdict(self))
         return struct.pack(HEADER_FORMAT, len(data)) + data
     
     @classmethod
     def from_bytes(cls, data: bytes) -> 'StatsResponse':
-        return cls(**json.loads(data.decode('utf-8')))
+        return cls(**_json_loads(data))
 
 
 # =============================================================================
@@ -212,7 +333,7 @@ class IPCServer:
         self._packet_pipe = None
         self._command_pipe = None
         self._threads: list[threading.Thread] = []
-        
+    
     def start(self):
         """Start IPC server threads."""
         if not WIN32_AVAILABLE:
@@ -286,10 +407,48 @@ class IPCServer:
             data = packet.to_bytes()
             win32file.WriteFile(self._packet_pipe, data)
             return True
+        except ValueError as e:
+            logger.warning(f"Packet encoding failed, dropping: {e}")
+            return False
         except pywintypes.error as e:
             logger.error(f"Failed to send packet: {e}")
             return False
     
+    def send_packets(self, packets: list[PacketData]) -> int:
+        """
+        Send a batch of packets to worker in one pipe write.
+        
+        Frames are length-prefixed, so the client's header/body reads
+        split the batch back into packets unchanged. Invalid packets
+        are dropped individually.
+        
+        Returns: number of packets sent
+        """
+        buffer = bytearray(len(packets) * FRAME_SIZE)
+        sent = 0
+        for packet in packets:
+            if not packet.validate():
+                logger.warning("Packet validation failed, dropping")
+                continue
+            try:
+                # A failed pack leaves this slot to be overwritten/trimmed
+                packet.pack_into(buffer, sent * FRAME_SIZE)
+                sent += 1
+            except ValueError as e:
+                logger.warning(f"Packet encoding failed, dropping: {e}")
+        
+        if not sent:
+            return 0
+        
+        try:
+            win32file.WriteFile(
+                self._packet_pipe, memoryview(buffer)[:sent * FRAME_SIZE]
+            )
+            return sent
+        except pywintypes.error as e:
+            logger.error(f"Failed to send packets: {e}")
+            return 0
+    
     def _command_listener(self):
         """Listen for commands from worker."""
         try:
@@ -319,7 +478,7 @@ class IPCServer:
                         self.on_command(cmd)
                 else:
                     logger.warning(f"Invalid command rejected: {cmd.type}")
-                    
+            
             except pywintypes.error as e:
                 if e.winerror == 109:  # Pipe closed
                     break
@@ -403,7 +562,7 @@ class IPCClient:
             self._connected = True
             logger.info("IPC Client connected to service")
             return True
-            
+        
         except pywintypes.error as e:
             logger.error(f"IPC connection failed: {e}")
             return False
@@ -427,20 +586,74 @@ class IPCClient:
             # Read data
             hr, data = win32file.ReadFile(self._packet_pipe, msg_len)
             
-            # Parse and validate
-            packet = PacketData.from_bytes(data)
-            if packet.validate():
-                return packet
-            else:
-                logger.warning("Received invalid packet, discarding")
-                return None
-                
+            return self._decode_packet(data)
+        
         except pywintypes.error as e:
             if e.winerror == 109:  # Pipe closed
                 self._connected = False
             logger.error(f"Packet receive error: {e}")
             return None
     
+    def receive_packets(self, max_batch: int = 64) -> list[PacketData]:
+        """
+        Receive a batch of packets (blocking for the first one).
+        
+        After the first packet, drains up to max_batch - 1 whole frames
+        that are already buffered in the pipe with a single read.
+        Never waits for more data; returns [] where receive_packet
+        would return None.
+        """
+        first = self.receive_packet()
+        if first is None:
+            return []
+        packets = [first]
+        
+        try:
+            _, available, _ = win32pipe.PeekNamedPipe(self._packet_pipe, 0)
+            want = min(available // FRAME_SIZE, max_batch - 1) * FRAME_SIZE
+            if not want:
+                return packets
+            
+            data = b""
+            while len(data) < want:  # bytes are buffered: never blocks long
+                hr, chunk = win32file.ReadFile(
+                    self._packet_pipe, want - len(data)
+                )
+                data += chunk
+        
+        except pywintypes.error as e:
+            if e.winerror == 109:  # Pipe closed
+                self._connected = False
+            logger.error(f"Packet receive error: {e}")
+            return packets
+        
+        # The server only sends PacketData frames, all FRAME_SIZE long
+        for offset in range(0, want, FRAME_SIZE):
+            msg_len = struct.unpack_from(HEADER_FORMAT, data, offset)[0]
+            if msg_len != PACKET_SIZE:
+                logger.warning(f"Unexpected frame length {msg_len}, discarding")
+                continue
+            body = data[offset + HEADER_SIZE:offset + FRAME_SIZE]
+            packet = self._decode_packet(body)
+            if packet is not None:
+                packets.append(packet)
+        
+        return packets
+    
+    @staticmethod
+    def _decode_packet(data: bytes) -> Optional[PacketData]:
+        """Parse and validate one frame body; None if rejected."""
+        try:
+            packet = PacketData.from_bytes(data)
+        except ValueError as e:
+            logger.warning(f"Received malformed packet, discarding: {e}")
+            return None
+        
+        if packet.validate():
+            return packet
+        logger.warning("Received invalid packet, discarding")
+        return None
+    
     def send_command(self, cmd: Command) -> bool:
         """Send command to service."""
         if not self._connected:
@@ -511,7 +724,23 @@ def create_mock_ipc():
         except queue.Empty:
             return None
     
+    def mock_send_batch(packets):
+        for packet in packets:
+            packet_queue.put(packet)
+        return len(packets)
+    
+    def mock_receive_batch(max_batch=64):
+        packets = []
+        while len(packets) < max_batch:
+            packet = mock_receive()
+            if packet is None:
+                break
+            packets.append(packet)
+        return packets
+    
     server.send_packet = mock_send
+    server.send_packets = mock_send_batch
     client.receive_packet = mock_receive
+    client.receive_packets = mock_receive_batch
     
     return server, client
@@ -1,25 +1,28 @@
 """
 Event Logger
 =============
-Async logging with optional HMAC integrity verification.
+Async logging with optional keyed-hash integrity verification.
 
 Security Fixes:
-  - #9: HMAC integrity for log entries
+  - #9: Signed log entries ("b2:" keyed BLAKE2b; legacy unprefixed
+    HMAC-SHA256 signatures still verify)
   - #10: Async logging to avoid blocking
   - #11: Support for encryption (optional, not implemented)
 """
 
+import copy
 import json
 import csv
-import hmac
 import hashlib
+import hmac
+import io
 import logging
 import os
+import time
 from pathlib import Path
-from queue import Queue, Empty
-from threading import Thread, Lock
-from datetime import datetime
-from typing import Optional, TYPE_CHECKING
+from collections import deque
+from threading import Thread, Lock, Event
+from typing import Optional, Union, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from ..models import IPProfile, ThreatEvent
@@ -31,27 +34,48 @@ from ..config import (
     TRAFFIC_LOG_FILENAME,
     get_log_integrity_secret,
 )
+from ..models import iso_now_cached
 
 logger = logging.getLogger(__name__)
 
+# Optional orjson: faster event serialization, stdlib json otherwise
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Signature version marker; unprefixed signatures are legacy HMAC-SHA256
+SIG_PREFIX = "b2:"
+
+
+def _json_bytes(obj: dict) -> bytes:
+    """Compact UTF-8 JSON; same output shape with or without orjson."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
 
 class EventLogger:
     """
     Thread-safe async event logger with integrity verification.
     
     Security Fixes:
-      - #9: HMAC signatures for log entries
+      - #9: Keyed BLAKE2b signatures for log entries
       - #10: Background thread for async writes
       - #11: Encryption placeholder (optional feature)
     """
     
+    QUEUE_SIZE = 10000
+    
     def __init__(self, log_dir: Path, enable_integrity: bool = False):
         """
         Initialize logger.
         
         Args:
             log_dir: Directory for log files
-            enable_integrity: Enable HMAC signing (Fix #9)
+            enable_integrity: Enable record signing (Fix #9)
         """
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(parents=True, exist_ok=True)
@@ -60,12 +84,29 @@ class EventLogger:
         self.watchlist_file = self.log_dir / WATCHLIST_LOG_FILENAME
         self.traffic_file = self.log_dir / TRAFFIC_LOG_FILENAME
         
-        # Fix #9: HMAC integrity
+        # Fix #9: Signed records
         self.enable_integrity = enable_integrity
         self._integrity_secret = get_log_integrity_secret() if enable_integrity else None
+        self._mac_base = self._init_mac(self._integrity_secret)
+        
+        # Fix #10: Async logging. deque append/popleft are atomic, so the
+        # producer side is a single append; maxlen drops the oldest on
+        # overflow instead of blocking.
+        self._write_queue: deque = deque(maxlen=self.QUEUE_SIZE)
+        self._has_data = Event()
+        self._idle = Event()  # set when queue drained and batch written
+        
+        # File locks for direct writes
+        self._watchlist_lock = Lock()
+        
+        # Initialize CSV
+        self._init_traffic_csv()
+        
+        # Append handles live as long as the logger; only the writer
+        # thread touches them
+        self._events_fh = self._open_append(self.events_file, 'ab')
+        self._traffic_fh = self._open_append(self.traffic_file, 'a')
         
-        # Fix #10: Async logging
-        self._write_queue: Queue = Queue(maxsize=10000)
         self._running = True
         self._writer_thread = Thread(
             target=self._writer_worker,
@@ -73,12 +114,17 @@ class EventLogger:
             name="EventLogger-Writer"
         )
         self._writer_thread.start()
-        
-        # File locks for direct writes
-        self._watchlist_lock = Lock()
-        
-        # Initialize CSV
-        self._init_traffic_csv()
+    
+    @staticmethod
+    def _open_append(path: Path, mode: str):
+        """Open a log file for appending; None (logged) on failure."""
+        try:
+            if 'b' in mode:
+                return open(path, mode)
+            return open(path, mode, newline='', encoding='utf-8')
+        except Exception as e:
+            logger.error(f"Failed to open {path.name}: {e}")
+            return None
     
     def _init_traffic_csv(self):
         """Initialize traffic CSV with headers."""
@@ -93,88 +139,167 @@ class EventLogger:
             except Exception as e:
                 logger.error(f"Failed to init traffic CSV: {e}")
     
-    def _compute_hmac(self, data: str) -> str:
+    @staticmethod
+    def _init_mac(secret: Optional[bytes]):
         """
-        Compute HMAC-SHA256 signature for data.
+        Build the keyed BLAKE2b state once; signing copies it per record.
+        
+        BLAKE2b keys are limited to 64 bytes, so a longer secret is
+        replaced by its 64-byte BLAKE2b digest (as HMAC does for keys
+        longer than its block size).
+        """
+        if not secret:
+            return None
+        if len(secret) > hashlib.blake2b.MAX_KEY_SIZE:
+            logger.info("Integrity secret longer than 64 bytes; using its BLAKE2b digest as key")
+            secret = hashlib.blake2b(secret).digest()
+        return hashlib.blake2b(key=secret, digest_size=8)
+    
+    def _compute_sig(self, data: Union[str, bytes]) -> str:
+        """
+        Compute versioned signature ("b2:" + 16 hex chars) for data.
         
         Security Fix #9: Provides integrity verification.
         """
-        if not self._integrity_secret:
+        if self._mac_base is None:
             return ""
         
-        signature = hmac.new(
-            self._integrity_secret,
-            data.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()[:16]  # Truncated for brevity
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        
+        mac = self._mac_base.copy()
+        mac.update(data)
+        return SIG_PREFIX + mac.hexdigest()
+    
+    def _verify_sig(self, data: Union[str, bytes], sig: str) -> bool:
+        """
+        Check a signature of either version.
+        
+        Unprefixed signatures are the pre-BLAKE2b format: HMAC-SHA256
+        truncated to 16 hex chars.
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
         
-        return signature
+        if sig.startswith(SIG_PREFIX):
+            expected = self._compute_sig(data)
+        else:
+            expected = hmac.new(
+                self._integrity_secret, data, hashlib.sha256
+            ).hexdigest()[:16]
+        return hmac.compare_digest(sig, expected)
     
     def _writer_worker(self):
         """
         Background writer thread.
         
         Security Fix #10: Non-blocking writes.
+        
+        Drains everything queued per tick and issues one write() per
+        file for the whole batch.
         """
-        while self._running:
-            try:
-                item = self._write_queue.get(timeout=0.5)
-            except Empty:
+        q = self._write_queue
+        has_data = self._has_data
+        idle = self._idle
+        popleft = q.popleft
+        
+        # Keep draining after stop() so queued records aren't lost
+        while self._running or q:
+            if not q:
+                idle.set()
+                has_data.wait(timeout=0.5)
+                has_data.clear()
                 continue
             
+            # Clear before popping so flush() never sees "empty and idle"
+            # while a batch is in flight
+            idle.clear()
+            batch = []
             try:
-                self._process_write(item)
+                for _ in range(len(q)):
+                    batch.append(popleft())
+            except IndexError:
+                pass
+            
+            self._process_batch(batch)
+        
+        idle.set()
+    
+    def _process_batch(self, batch: list):
+        """Format a batch of queued items and write each file once."""
+        event_lines = []
+        traffic_rows = []
+        
+        for write_type, data in batch:
+            try:
+                if write_type == 'event':
+                    event_lines.append(self._format_event(data.to_dict()))
+                elif write_type == 'traffic':
+                    traffic_rows.append(self._format_traffic(data))
             except Exception as e:
                 logger.error(f"Write error: {e}")
+        
+        if event_lines:
+            self._write_events(event_lines)
+        if traffic_rows:
+            self._write_traffic_rows(traffic_rows)
     
-    def _process_write(self, item: dict):
-        """Process a write item from the queue."""
-        write_type = item.get('type')
-        
-        if write_type == 'event':
-            self._write_event(item['data'])
-        elif write_type == 'traffic':
-            self._write_traffic(item['data'])
-    
-    def _write_event(self, event_dict: dict):
-        """Write event to JSONL file."""
-        line = json.dumps(event_dict, ensure_ascii=False)
+    def _format_event(self, event_dict: dict) -> bytes:
+        """Serialize event to a JSONL line (signed if enabled)."""
+        line = _json_bytes(event_dict)
         
         if self.enable_integrity:
-            sig = self._compute_hmac(line)
+            sig = self._compute_sig(line)
             event_dict['_sig'] = sig
-            line = json.dumps(event_dict, ensure_ascii=False)
+            line = _json_bytes(event_dict)
         
-        try:
-            with open(self.events_file, 'a', encoding='utf-8') as f:
-                f.write(line + "\n")
-        except Exception as e:
-            logger.error(f"Failed to write event: {e}")
+        return line
     
-    def _write_traffic(self, traffic_data: dict):
-        """Write traffic entry to CSV."""
+    def _format_traffic(self, entry: tuple) -> list:
+        """Build a traffic CSV row (signed if enabled)."""
+        timestamp, ip, country, asn, network, speed_mbps, throttled, score = entry
         row = [
-            traffic_data['timestamp'],
-            traffic_data['ip'],
-            traffic_data['country'],
-            traffic_data['asn'],
-            traffic_data['network'],
-            traffic_data['speed'],
-            traffic_data['throttled'],
-            traffic_data['score'],
+            timestamp,
+            ip,
+            country,
+            asn,
+            network,
+            f"{speed_mbps:.2f}",
+            "Yes" if throttled else "No",
+            score,
         ]
         
         if self.enable_integrity:
             row_str = ','.join(str(x) for x in row)
-            sig = self._compute_hmac(row_str)
+            sig = self._compute_sig(row_str)
             row.append(sig)
         else:
             row.append("")
         
+        return row
+    
+    def _write_events(self, lines: list[bytes]):
+        """Append event lines to JSONL file in one write."""
+        if self._events_fh is None:
+            return
+        
+        try:
+            self._events_fh.write(b"\n".join(lines) + b"\n")
+            self._events_fh.flush()
+        except Exception as e:
+            logger.error(f"Failed to write event: {e}")
+    
+    def _write_traffic_rows(self, rows: list[list]):
+        """Append rows to traffic CSV in one write."""
+        if self._traffic_fh is None:
+            return
+        
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        
         try:
-            with open(self.traffic_file, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(row)
+            self._traffic_fh.write(buf.getvalue())
+            self._traffic_fh.flush()
         except Exception as e:
             logger.error(f"Failed to write traffic: {e}")
     
@@ -182,42 +307,48 @@ class EventLogger:
         """
         Queue an event for async logging.
         
+        The event is snapshotted now, so later changes by the caller
+        are not logged; serialization (to_dict, timestamp formatting)
+        runs on the writer thread, not the caller's.
+        
         Args:
             event: ThreatEvent to log
         """
-        try:
-            self._write_queue.put_nowait({
-                'type': 'event',
-                'data': event.to_dict()
-            })
-        except Exception:
-            pass  # Queue full, drop event
+        snapshot = copy.copy(event)  # Shallow field copy, no re-sanitizing
+        snapshot.details = dict(event.details)
+        self._write_queue.append(('event', snapshot))
+        self._notify_writer()
     
     def log_traffic(self, profile: "IPProfile", speed_mbps: float, was_throttled: bool):
         """
         Queue traffic entry for async logging.
         
+        Profile fields are snapshotted now; formatting is deferred to
+        the writer thread.
+        
         Args:
             profile: IP profile
             speed_mbps: Current speed
             was_throttled: Whether packet was throttled
         """
-        try:
-            self._write_queue.put_nowait({
-                'type': 'traffic',
-                'data': {
-                    'timestamp': datetime.now().isoformat(),
-                    'ip': profile.ip,
-                    'country': profile.country,
-                    'asn': profile.asn,
-                    'network': profile.network_name,
-                    'speed': f"{speed_mbps:.2f}",
-                    'throttled': "Yes" if was_throttled else "No",
-                    'score': profile.threat_score,
-                }
-            })
-        except Exception:
-            pass
+        # Flat tuple in CSV column order; string formatting happens on
+        # the writer thread
+        self._write_queue.append(('traffic', (
+            iso_now_cached(),
+            profile.ip,
+            profile.country,
+            profile.asn,
+            profile.network_name,
+            speed_mbps,
+            was_throttled,
+            profile.threat_score,
+        )))
+        self._notify_writer()
+    
+    def _notify_writer(self):
+        """Wake the writer. Skips Event.set() (a lock) when already set."""
+        if not self._has_data.is_set():
+            self._has_data.set()
     
     def save_watchlist(self, watchlist: list["IPProfile"]):
         """
@@ -231,7 +362,7 @@ class EventLogger:
             entry = profile.to_dict()
             if self.enable_integrity:
                 entry_str = json.dumps(entry, sort_keys=True)
-                entry['_sig'] = self._compute_hmac(entry_str)
+                entry['_sig'] = self._compute_sig(entry_str)
             data.append(entry)
         
         with self._watchlist_lock:
@@ -252,7 +383,7 @@ class EventLogger:
         
         Args:
             filepath: Path to log file
-            
+        
         Returns:
             True if all entries have valid signatures
         """
@@ -271,10 +402,9 @@ class EventLogger:
                         return False
                     
                     entry_str = json.dumps(entry, sort_keys=True)
-                    expected = self._compute_hmac(entry_str)
-                    if sig != expected:
+                    if not self._verify_sig(entry_str, sig):
                         return False
-                        
+            
             return True
         except Exception as e:
             logger.error(f"Integrity verification failed: {e}")
@@ -283,10 +413,22 @@ class EventLogger:
     def stop(self):
         """Stop writer thread gracefully."""
         self._running = False
+        self._has_data.set()
         self._writer_thread.join(timeout=2.0)
+        
+        # Writer may still hold the handles if the join timed out
+        if not self._writer_thread.is_alive():
+            for fh in (self._events_fh, self._traffic_fh):
+                if fh is not None:
+                    fh.close()
+            self._events_fh = self._traffic_fh = None
     
     def flush(self):
-        """Wait for all queued writes to complete."""
-        while not self._write_queue.empty():
-            import time
-            time.sleep(0.1)
+        """Wait for all queued writes to complete (written to disk)."""
+        while self._write_queue or not self._idle.is_set():
+            if not self._writer_thread.is_alive():
+                break
+            if self._idle.is_set():
+                time.sleep(0.001)  # Writer not woken yet
+            else:
+                self._idle.wait(timeout=0.1)
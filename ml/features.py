@@ -7,6 +7,7 @@ Security Note: All features are sanitized and bounded to prevent
 adversarial manipulation of model inputs.
 """
 
+import re
 import numpy as np
 from typing import TYPE_CHECKING
 from dataclasses import dataclass
@@ -15,7 +16,7 @@ if TYPE_CHECKING:
     from ..models import IPProfile
 
 
-@dataclass
+@dataclass(slots=True)
 class TrafficFeatures:
     """
     Normalized feature vector for ML models.
@@ -84,6 +85,12 @@ class FeatureExtractor:
             high_risk_countries: Set of high-risk country codes
         """
         self.high_risk_countries = high_risk_countries
+        
+        # One pass per description instead of one per keyword
+        self._hosting_re = re.compile(
+            '|'.join(re.escape(kw) for kw in sorted(self.HOSTING_KEYWORDS)),
+            re.IGNORECASE
+        )
     
     def extract(self, profile: "IPProfile", 
                 current_speed: float = 0.0,
@@ -94,12 +101,30 @@ class FeatureExtractor:
         
         All features are bounded and sanitized.
         """
+        return self.extract_counts(
+            profile.total_packets, profile.throttled_packets,
+            profile.country, profile.asn_description,
+            current_speed, max_bandwidth, protocol,
+        )
+    
+    def extract_counts(self, total_packets: int, throttled_packets: int,
+                       country: str = "Unknown",
+                       asn_description: str = "Unknown",
+                       current_speed: float = 0.0,
+                       max_bandwidth: float = 50.0,
+                       protocol: str = "udp") -> TrafficFeatures:
+        """
+        Extract features from raw counters (no IPProfile needed).
+        
+        Used by the worker, which tracks counters per IP and only has
+        country/ASN once intel has resolved them.
+        """
         # Speed features
         speed_ratio = self._clamp(current_speed / max(max_bandwidth, 1.0), 0, 2.0)
         
         # Throttle ratio
-        if profile.total_packets > 0:
-            throttle_ratio = profile.throttled_packets / profile.total_packets
+        if total_packets > 0:
+            throttle_ratio = throttled_packets / total_packets
         else:
             throttle_ratio = 0.0
         
@@ -114,7 +139,7 @@ class FeatureExtractor:
         
         # Packets per minute
         ppm = self._clamp(
-            profile.total_packets / max(duration_hours * 60, 1),
+            total_packets / max(duration_hours * 60, 1),
             0, self.MAX_PACKETS_PER_MIN
         ) / self.MAX_PACKETS_PER_MIN
         
@@ -122,10 +147,9 @@ class FeatureExtractor:
         protocol_udp = 1.0 if protocol.lower() == "udp" else 0.0
         
         # Geo/ASN features
-        is_high_risk = 1.0 if profile.country in self.high_risk_countries else 0.0
+        is_high_risk = 1.0 if country in self.high_risk_countries else 0.0
         
-        asn_lower = profile.asn_description.lower()
-        is_hosting = 1.0 if any(kw in asn_lower for kw in self.HOSTING_KEYWORDS) else 0.0
+        is_hosting = 1.0 if self._hosting_re.search(asn_description) else 0.0
         
         return TrafficFeatures(
             speed_ratio=speed_ratio,
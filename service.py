@@ -22,7 +22,8 @@ import logging
 import ctypes
 from typing import Optional, Set
 from datetime import datetime
-from threading import Lock
+from threading import Event, Lock, Thread
+from collections import deque
 
 from .ipc import (
     IPCServer, PacketData, Command, CommandType, StatsResponse,
@@ -42,6 +43,35 @@ except ImportError:
     logger.error("pydivert not installed")
 
 
+# WinDivert filters (precomputed per mode)
+_VRCHAT_PORT_CONDITIONS = [
+    "(udp.SrcPort == 5055 or udp.SrcPort == 5056 or udp.SrcPort == 5058)",
+    "(udp.SrcPort >= 27000 and udp.SrcPort <= 27100)",
+]
+
+SERVICE_FILTERS = {
+    MODE_VRCHAT: f"inbound and udp and ({' or '.join(_VRCHAT_PORT_CONDITIONS)})",
+    MODE_UNIVERSAL: "inbound and (tcp or udp)",
+}
+DEFAULT_FILTER = "inbound and udp"
+
+# Throttle pre-filter: Bloom-style slot table in front of throttled_ips.
+# Two slots per IP derived from one hash; a miss on either slot means
+# "definitely not throttled" and skips the lock + set lookup.
+THROTTLE_FILTER_SLOTS = 1 << 16
+THROTTLE_FILTER_MASK = THROTTLE_FILTER_SLOTS - 1
+
+
+def _build_throttle_filter(ips) -> bytearray:
+    """Build a fresh pre-filter table for the given IPs."""
+    table = bytearray(THROTTLE_FILTER_SLOTS)
+    for ip in ips:
+        h = hash(ip)
+        table[h & THROTTLE_FILTER_MASK] = 1
+        table[(h >> 16) & THROTTLE_FILTER_MASK] = 1
+    return table
+
+
 def is_admin() -> bool:
     """Check if running with admin privileges."""
     try:
@@ -71,6 +101,8 @@ class MinimalService:
     
     # Performance tuning
     STATS_UPDATE_INTERVAL = 1.0
+    ACCOUNTING_QUEUE_SIZE = 8192  # Oldest entries dropped (and counted) if IPC lags
+    ACCOUNTING_BATCH = 64
     
     def __init__(self, config: NetShieldConfig):
         self.config = config
@@ -86,28 +118,45 @@ class MinimalService:
         self.throttled_ips: Set[str] = set()
         self.throttle_lock = Lock()
         
-        # Statistics
+        # Lock-free pre-check for the common "not throttled" case.
+        # Throttle sets slots in place (a racing reader at worst lets one
+        # more packet through, as if it arrived before the command);
+        # unthrottle rebuilds the table and rebinds it, since slots may
+        # be shared with other throttled IPs.
+        self._throttle_filter = _build_throttle_filter(())
+        
+        # Statistics (written only by the recv thread, so always exact)
         self.stats_lock = Lock()
         self.total_packets = 0
         self.total_bytes = 0
         self.throttled_count = 0
+        self.ipc_overflow = 0  # Forwarded packets never reported to the worker
+        
+        # Recv thread -> accounting thread handoff of worker IPC for
+        # forwarded packets (single producer, single consumer; deque
+        # append/popleft are atomic under the GIL).
+        # Entries: (packet, src_ip, size, timestamp_ns)
+        self._accounting_q: deque = deque(maxlen=self.ACCOUNTING_QUEUE_SIZE)
+        self._accounting_ready = Event()
+        self._accounting_thread: Optional[Thread] = None
+        
+        # Command dispatch: one dict probe, no enum construction
+        self._cmd_dispatch = {
+            CommandType.THROTTLE_IP.value: self._do_throttle,
+            CommandType.UNTHROTTLE_IP.value: self._do_unthrottle,
+            CommandType.SHUTDOWN.value: self._do_shutdown,
+            CommandType.GET_STATS.value: self._do_get_stats,
+        }
         
         # IPC
         self.ipc = IPCServer(on_command=self._handle_command)
+        
+        # Filter is a pure function of mode — resolve once
+        self._filter_str = self._build_filter()
     
     def _build_filter(self) -> str:
         """Build WinDivert filter based on mode."""
-        if self.config.mode == MODE_VRCHAT:
-            ports = [
-                "(udp.SrcPort == 5055 or udp.SrcPort == 5056 or udp.SrcPort == 5058)",
-                "(udp.SrcPort >= 27000 and udp.SrcPort <= 27100)",
-            ]
-            return f"inbound and udp and ({' or '.join(ports)})"
-        
-        elif self.config.mode == MODE_UNIVERSAL:
-            return "inbound and (tcp or udp)"
-        
-        return "inbound and udp"
+        return SERVICE_FILTERS.get(self.config.mode, DEFAULT_FILTER)
     
     def _handle_command(self, cmd: Command):
         """
@@ -115,31 +164,130 @@ class MinimalService:
         
         Security: Only whitelisted commands reach here.
         """
-        try:
-            cmd_type = CommandType(cmd.type)
-        except ValueError:
+        handler = self._cmd_dispatch.get(cmd.type)
+        if handler is None:
             logger.warning(f"Unknown command: {cmd.type}")
             return
+        handler(cmd)
+    
+    def _do_throttle(self, cmd: Command):
+        """Add IP to drop list."""
+        if cmd.target_ip:
+            with self.throttle_lock:
+                self.throttled_ips.add(cmd.target_ip)
+                h = hash(cmd.target_ip)
+                self._throttle_filter[h & THROTTLE_FILTER_MASK] = 1
+                self._throttle_filter[(h >> 16) & THROTTLE_FILTER_MASK] = 1
+            logger.info(f"Throttling IP: {cmd.target_ip}")
+    
+    def _do_unthrottle(self, cmd: Command):
+        """Remove IP from drop list."""
+        if cmd.target_ip:
+            with self.throttle_lock:
+                self.throttled_ips.discard(cmd.target_ip)
+                # Set is small — rebuild instead of counting slots
+                self._throttle_filter = _build_throttle_filter(self.throttled_ips)
+            logger.info(f"Unthrottling IP: {cmd.target_ip}")
+    
+    def _do_shutdown(self, cmd: Command):
+        """Stop the service loop."""
+        logger.info("Shutdown command received")
+        self.running = False
+    
+    def _do_get_stats(self, cmd: Command):
+        """GET_STATS handler."""
+        # Stats will be sent via separate mechanism
+        pass
+    
+    def _is_throttled(self, ip: str) -> bool:
+        """
+        Check if IP is on the worker's throttle list.
+        
+        Pre-filter miss = definitely clean, no lock taken.
+        """
+        flt = self._throttle_filter
+        h = hash(ip)
+        if flt[h & THROTTLE_FILTER_MASK] and flt[(h >> 16) & THROTTLE_FILTER_MASK]:
+            with self.throttle_lock:
+                return ip in self.throttled_ips
+        return False
+    
+    def _account(self, packet, src_ip: str, size: int, dropped: bool):
+        """
+        Recv-thread accounting for one packet.
+        
+        Counters are updated inline; forwarded packets are queued for the
+        accounting thread, which does the worker IPC.
+        """
+        self.total_packets += 1
+        self.total_bytes += size
+        if dropped:
+            self.throttled_count += 1
+            return
         
-        if cmd_type == CommandType.THROTTLE_IP:
-            if cmd.target_ip:
-                with self.throttle_lock:
-                    self.throttled_ips.add(cmd.target_ip)
-                logger.info(f"Throttling IP: {cmd.target_ip}")
+        q = self._accounting_q
+        if len(q) == q.maxlen:
+            self.ipc_overflow += 1  # append() below evicts the oldest entry
+        q.append((packet, src_ip, size, time.monotonic_ns()))
         
-        elif cmd_type == CommandType.UNTHROTTLE_IP:
-            if cmd.target_ip:
-                with self.throttle_lock:
-                    self.throttled_ips.discard(cmd.target_ip)
-                logger.info(f"Unthrottling IP: {cmd.target_ip}")
+        ready = self._accounting_ready
+        if not ready.is_set():
+            ready.set()
+    
+    def _drain_accounting(self) -> int:
+        """
+        Forward up to ACCOUNTING_BATCH queued packets to the worker.
         
-        elif cmd_type == CommandType.SHUTDOWN:
-            logger.info("Shutdown command received")
-            self.running = False
+        Packet metadata is parsed here, off the recv thread, and sent
+        with one pipe write for the whole batch.
         
-        elif cmd_type == CommandType.GET_STATS:
-            # Stats will be sent via separate mechanism
+        Returns: number of entries processed
+        """
+        q = self._accounting_q
+        batch = []
+        try:
+            for _ in range(self.ACCOUNTING_BATCH):
+                batch.append(q.popleft())
+        except IndexError:
             pass
+        
+        if not batch:
+            return 0
+        
+        # Send packet info to worker for analysis
+        # (only non-dropped packets are queued, to reduce IPC load)
+        forwarded = [
+            PacketData(
+                src_ip=src_ip,
+                dst_ip=packet.dst_addr,
+                src_port=packet.src_port or 0,
+                dst_port=packet.dst_port or 0,
+                protocol="udp" if packet.udp is not None else "tcp",
+                size=size,
+                timestamp=ts,
+            )
+            for packet, src_ip, size, ts in batch
+        ]
+        self.ipc.send_packets(forwarded)
+        
+        return len(batch)
+    
+    def _accounting_loop(self):
+        """Accounting thread: drain until stopped and queue is empty."""
+        q = self._accounting_q
+        ready = self._accounting_ready
+        
+        while self.running or q:
+            if not q:
+                ready.wait(timeout=0.5)
+                ready.clear()
+                continue
+            
+            try:
+                self._drain_accounting()
+            except Exception as e:
+                logger.error(f"Accounting error: {e}")
+                time.sleep(0.1)  # Back off instead of spinning on a broken pipe
     
     def run(self):
         """
@@ -149,6 +297,7 @@ class MinimalService:
             - No allocations in loop
             - No locks in hot path (except throttle check)
             - Minimal validation
+            - Stats and worker IPC on a separate accounting thread
         """
         if not is_admin():
             logger.error("Administrator privileges required!")
@@ -173,10 +322,17 @@ class MinimalService:
         print("[+] Worker connected")
         
         # Build filter
-        filter_str = self._build_filter()
+        filter_str = self._filter_str
         self.running = True
         self.start_time = time.time()
         
+        self._accounting_thread = Thread(
+            target=self._accounting_loop,
+            daemon=True,
+            name="Service-Accounting"
+        )
+        self._accounting_thread.start()
+        
         print(f"[*] Filter: {filter_str[:60]}...")
         print("[*] Service running. Press Ctrl+C to stop.")
         
@@ -184,9 +340,16 @@ class MinimalService:
             with pydivert.WinDivert(filter_str) as w:
                 logger.info("WinDivert opened successfully")
                 
+                # Hot-loop locals (avoid LOAD_ATTR per packet)
+                recv = w.recv
+                send = w.send
+                is_throttled = self._is_throttled
+                bucket_consume = self.bucket.consume
+                account = self._account
+                
                 while self.running:
                     try:
-                        packet = w.recv()
+                        packet = recv()
                     except OSError as e:
                         logger.error(f"Recv error: {e}")
                         continue
@@ -196,45 +359,24 @@ class MinimalService:
                     
                     # === HOT PATH START ===
                     
-                    src_ip = packet.src_addr
+                    src_ip = packet.src_addr  # parsed once, reused below
                     packet_size = len(packet.raw)
                     
                     # Check if IP is throttled by worker
-                    with self.throttle_lock:
-                        ip_throttled = src_ip in self.throttled_ips
+                    ip_throttled = is_throttled(src_ip)
                     
                     # Token bucket check
-                    allowed, _ = self.bucket.consume(packet_size)
+                    allowed, _ = bucket_consume(packet_size)
                     
                     # Decision: drop or forward
                     should_drop = ip_throttled or not allowed
                     
-                    # Update stats
-                    with self.stats_lock:
-                        self.total_packets += 1
-                        self.total_bytes += packet_size
-                        if should_drop:
-                            self.throttled_count += 1
+                    if not should_drop:
+                        # FORWARD (DROP = don't call w.send())
+                        send(packet)
                     
-                    if should_drop:
-                        # DROP — don't call w.send()
-                        pass
-                    else:
-                        # FORWARD
-                        w.send(packet)
-                        
-                        # Send packet info to worker for analysis
-                        # (only for non-dropped packets to reduce IPC load)
-                        packet_data = PacketData(
-                            src_ip=src_ip,
-                            dst_ip=packet.dst_addr,
-                            src_port=packet.src_port or 0,
-                            dst_port=packet.dst_port or 0,
-                            protocol="udp" if packet.udp else "tcp",
-                            size=packet_size,
-                            timestamp=time.time(),
-                        )
-                        self.ipc.send_packet(packet_data)
+                    # Count here; worker IPC goes to the accounting thread
+                    account(packet, src_ip, packet_size, should_drop)
                     
                     # === HOT PATH END ===
         
@@ -256,6 +398,9 @@ class MinimalService:
     def _shutdown(self):
         """Graceful shutdown."""
         self.running = False
+        self._accounting_ready.set()
+        if self._accounting_thread:
+            self._accounting_thread.join(timeout=1.0)
         self.ipc.stop()
         
         # Print final stats
@@ -265,6 +410,8 @@ class MinimalService:
         print(f"    Packets: {self.total_packets:,}")
         print(f"    Bytes: {self.total_bytes / 1024 / 1024:.2f} MB")
         print(f"    Throttled: {self.throttled_count:,}")
+        if self.ipc_overflow:
+            print(f"    Not sent to worker (queue full): {self.ipc_overflow:,}")
         print(f"    Blocked IPs: {len(self.throttled_ips)}")
         
         logger.info("Service shutdown complete")
@@ -276,6 +423,7 @@ class MinimalService:
                 total_packets=self.total_packets,
                 total_bytes=self.total_bytes,
                 throttled_packets=self.throttled_count,
+                ipc_overflow=self.ipc_overflow,
                 throttled_ips=list(self.throttled_ips),
                 uptime_seconds=time.time() - (self.start_time or time.time())
             )
@@ -27,6 +27,7 @@ class BandwidthMonitor:
         
         self.window = window_sec
         self._samples: deque = deque()
+        self._total_bytes = 0  # running sum of bytes in _samples
         self._lock = Lock()
     
     def add_sample(self, num_bytes: int):
@@ -43,13 +44,15 @@ class BandwidthMonitor:
         
         with self._lock:
             self._samples.append((now, num_bytes))
+            self._total_bytes += num_bytes
             self._cleanup(now)
     
     def _cleanup(self, now: float):
         """Remove samples outside the window."""
         cutoff = now - self.window
-        while self._samples and self._samples[0][0] < cutoff:
-            self._samples.popleft()
+        samples = self._samples
+        while samples and samples[0][0] < cutoff:
+            self._total_bytes -= samples.popleft()[1]
     
     def get_speed_mbps(self) -> float:
         """
@@ -66,8 +69,7 @@ class BandwidthMonitor:
             if not self._samples:
                 return 0.0
             
-            total_bytes = sum(b for _, b in self._samples)
-            return total_bytes / (1024 * 1024) / self.window
+            return self._total_bytes / (1024 * 1024) / self.window
     
     def get_speed_bps(self) -> float:
         """Get speed in bytes per second."""
@@ -79,8 +81,7 @@ class BandwidthMonitor:
             if not self._samples:
                 return 0.0
             
-            total_bytes = sum(b for _, b in self._samples)
-            return total_bytes / self.window
+            return self._total_bytes / self.window
     
     def get_sample_count(self) -> int:
         """Get number of samples in window."""
@@ -91,3 +92,4 @@ class BandwidthMonitor:
         """Clear all samples."""
         with self._lock:
             self._samples.clear()
+            self._total_bytes = 0
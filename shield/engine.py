@@ -15,11 +15,12 @@ Security Fixes:
 """
 
 import time
+import heapq
 import logging
 from datetime import datetime
 from threading import Lock
 from typing import TYPE_CHECKING, Optional
-from collections import defaultdict
+from collections import OrderedDict
 from dataclasses import dataclass, field
 
 if TYPE_CHECKING:
@@ -43,11 +44,32 @@ except ImportError:
     logger.error("pydivert not installed. Shield engine disabled.")
 
 
+# ============================================================================
+# WINDIVERT FILTERS (precomputed per mode)
+# ============================================================================
+
+# VRChat: Both UDP and TCP for tracking which kills the game
+_VRCHAT_PORT_CONDITIONS = [
+    # UDP Photon
+    "(udp and (udp.SrcPort == 5055 or udp.SrcPort == 5056 or udp.SrcPort == 5058))",
+    # UDP Steam
+    "(udp and udp.SrcPort >= 27000 and udp.SrcPort <= 27100)",
+    # TCP (for tracking, не для лимита)
+    "(tcp and (tcp.SrcPort == 80 or tcp.SrcPort == 443))"
+]
+
+ENGINE_FILTERS = {
+    MODE_VRCHAT: f"inbound and ({' or '.join(_VRCHAT_PORT_CONDITIONS)})",
+    MODE_UNIVERSAL: "inbound and (tcp or udp)",
+}
+DEFAULT_FILTER = "inbound and udp"
+
+
 # ============================================================================
 # PROTOCOL TRACKING
 # ============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class ProtocolStats:
     """Per-protocol statistics."""
     packets: int = 0
@@ -56,15 +78,24 @@ class ProtocolStats:
     dropped_bytes: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class IPStats:
     """Lightweight per-IP stats for hot path (no WHOIS)."""
     packets: int = 0
     bytes: int = 0
     dropped: int = 0
-    first_seen: float = 0.0
-    last_seen: float = 0.0
+    first_seen: int = 0  # time.monotonic_ns()
+    last_seen: int = 0
     protocol: str = "unknown"  # Last seen protocol
+    
+    def reset(self, first_seen: int):
+        """Zero the counters for reuse by a newly seen IP."""
+        self.packets = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.first_seen = first_seen
+        self.last_seen = 0
+        self.protocol = "unknown"
 
 
 # ============================================================================
@@ -90,6 +121,11 @@ class ShieldEngine:
     LOG_SAMPLE_RATE = 100  # Log every Nth packet during flood
     STATS_UPDATE_INTERVAL = 0.5  # Seconds between UI updates
     WATCHLIST_SAVE_INTERVAL = 30  # Seconds between watchlist saves
+    BW_FLUSH_PACKETS = 64  # Batch bandwidth samples per monitor update
+    BW_FLUSH_INTERVAL_NS = 50_000_000  # ...or flush after 50 ms
+    TOP_DROPPED_K = 64  # Top-offender candidates kept online
+    MAX_TRACKED_IPS = 65536  # ip_stats LRU capacity (bounded under spoofed floods)
+    IPSTATS_POOL_SIZE = 4096  # Evicted IPStats kept for reuse
     
     def __init__(self, config: "NetShieldConfig", event_logger: "EventLogger"):
         if not PYDIVERT_AVAILABLE:
@@ -106,19 +142,38 @@ class ShieldEngine:
         bucket_bytes = config.burst_size_mb * 1024 * 1024
         self.bucket = TokenBucket(rate_bytes, bucket_bytes)
         
-        # Bandwidth monitoring
+        # Bandwidth monitoring (samples batched in hot path)
         self.monitor = BandwidthMonitor()
+        self._bw_accum = 0
+        self._bw_count = 0
+        self._bw_last_flush = time.monotonic_ns()
         
         # Intel (WHOIS runs in background thread)
         self.intel = ThreatIntel(config)
         
-        # Protocol tracking
-        self.proto_stats: dict[str, ProtocolStats] = defaultdict(ProtocolStats)
+        # Protocol tracking (only UDP/TCP are ever captured)
+        self.udp_stats = ProtocolStats()
+        self.tcp_stats = ProtocolStats()
         self.proto_lock = Lock()
+        # Recv-thread accumulators: [packets, bytes, dropped, dropped_bytes].
+        # Merged into udp/tcp_stats by _flush_proto_stats(), which only the
+        # recv thread calls (periodic tick and shutdown); other threads read
+        # the merged stats under proto_lock, up to 100 packets stale.
+        self._local_udp = [0, 0, 0, 0]
+        self._local_tcp = [0, 0, 0, 0]
         
         # Lightweight IP tracking (no WHOIS in hot path)
-        self.ip_stats: dict[str, IPStats] = {}
+        # LRU-bounded: a spoofed-source flood evicts idle IPs instead of
+        # growing without limit. Top offenders survive via _top_dropped.
+        self.ip_stats: OrderedDict[str, IPStats] = OrderedDict()
+        # Recycled IPStats from evictions: a scan churns through new IPs,
+        # and reset() is cheaper than constructing a dataclass
+        self._ipstats_pool: list[IPStats] = []
         self.ip_lock = Lock()
+        # Top offenders by drops, maintained online (no full sort at summary).
+        # Any IP whose drop count passes the threshold is a candidate.
+        self._top_dropped: dict[str, IPStats] = {}
+        self._top_dropped_threshold = 0
         
         # State
         self.running = False
@@ -128,26 +183,21 @@ class ShieldEngine:
         # Flood detection
         self.flood_mode = False
         self.flood_threshold_mbps = config.max_bandwidth_mbps * 0.8
+        
+        # Filter is a pure function of mode — resolve once
+        self._filter_str = self.build_filter()
+        # Modes without a dedicated filter capture UDP only, so the
+        # per-packet protocol probe can be skipped for the session
+        self._udp_only = config.mode not in ENGINE_FILTERS
+    
+    @property
+    def proto_stats(self) -> dict[str, ProtocolStats]:
+        """Protocol stats keyed by name (read-only view)."""
+        return {"udp": self.udp_stats, "tcp": self.tcp_stats}
     
     def build_filter(self) -> str:
         """Build WinDivert filter based on mode."""
-        if self.config.mode == MODE_VRCHAT:
-            # VRChat: Both UDP and TCP for tracking which kills the game
-            port_conditions = [
-                # UDP Photon
-                "(udp and (udp.SrcPort == 5055 or udp.SrcPort == 5056 or udp.SrcPort == 5058))",
-                # UDP Steam
-                "(udp and udp.SrcPort >= 27000 and udp.SrcPort <= 27100)",
-                # TCP (for tracking, не для лимита)
-                "(tcp and (tcp.SrcPort == 80 or tcp.SrcPort == 443))"
-            ]
-            return f"inbound and ({' or '.join(port_conditions)})"
-        
-        elif self.config.mode == MODE_UNIVERSAL:
-            return "inbound and (tcp or udp)"
-        
-        else:
-            return "inbound and udp"
+        return ENGINE_FILTERS.get(self.config.mode, DEFAULT_FILTER)
     
     def run(self, stats_callback=None, stop_event=None):
         """
@@ -158,7 +208,7 @@ class ShieldEngine:
           - Minimal object creation
           - Sampled logging
         """
-        filter_str = self.build_filter()
+        filter_str = self._filter_str
         self.running = True
         self.start_time = datetime.now().isoformat()
         
@@ -167,17 +217,23 @@ class ShieldEngine:
         last_flood_check = time.perf_counter()
         
         error_count = 0
+        # Hot-loop locals (avoid LOAD_ATTR per packet); counter is
+        # written back to self.packet_counter on the periodic tick
+        packet_counter = self.packet_counter
+        process = self._process_packet_fast
         
         try:
             with pydivert.WinDivert(filter_str) as w:
                 logger.info(f"Shield v2 started: {filter_str[:80]}...")
+                recv = w.recv
+                send = w.send
                 
                 while self.running:
                     if stop_event and stop_event.is_set():
                         break
                     
                     try:
-                        packet = w.recv()
+                        packet = recv()
                         error_count = 0
                     except OSError as e:
                         error_count += 1
@@ -193,22 +249,26 @@ class ShieldEngine:
                     # Minimal work here!
                     
                     packet_size = len(packet.raw)
-                    should_drop = self._process_packet_fast(packet, packet_size)
+                    should_drop = process(packet, packet_size, packet_counter)
                     
                     if should_drop:
                         # DROP - don't call w.send()
                         # This is safe: WinDivert drops packet if not re-injected
                         pass
                     else:
-                        w.send(packet)
+                        send(packet)
                     
                     # === HOT PATH END ===
                     
                     # Periodic tasks (only check time, not every packet)
-                    self.packet_counter += 1
-                    if self.packet_counter % 100 == 0:
+                    packet_counter += 1
+                    if packet_counter % 100 == 0:
+                        self.packet_counter = packet_counter
                         now = time.perf_counter()
                         
+                        # Publish local protocol counters
+                        self._flush_proto_stats()
+                        
                         # Stats callback
                         if stats_callback and now - last_stats_time > self.STATS_UPDATE_INTERVAL:
                             stats_callback(self._get_stats())
@@ -232,68 +292,149 @@ class ShieldEngine:
             logger.exception(f"Engine error: {e}")
             raise
         finally:
+            self.packet_counter = packet_counter
             self._graceful_shutdown()
     
-    def _process_packet_fast(self, packet, packet_size: int) -> bool:
+    def _process_packet_fast(self, packet, packet_size: int,
+                             packet_counter: Optional[int] = None) -> bool:
         """
         Fast packet processing - HOT PATH.
         
+        Args:
+            packet_counter: Loop-local counter from run() (used for sampling);
+                defaults to self.packet_counter
+        
         Returns:
             True = DROP packet, False = ALLOW packet
         """
-        # Get protocol (minimal parsing)
-        is_udp = hasattr(packet, 'udp') and packet.udp
+        if packet_counter is None:
+            packet_counter = self.packet_counter
+        
+        # Get protocol (minimal parsing; pydivert returns None for absent headers)
+        is_udp = self._udp_only or packet.udp is not None
         proto = "udp" if is_udp else "tcp"
         src_ip = packet.src_addr
-        src_port = packet.src_port if hasattr(packet, 'src_port') else 0
+        src_port = packet.src_port or 0
+        now = time.monotonic_ns()  # one int clock read shared below
         
-        # Update bandwidth monitor
-        self.monitor.add_sample(packet_size)
+        # Update bandwidth monitor (batched: one monitor lock per batch)
+        self._bw_accum += packet_size
+        self._bw_count += 1
+        if (self._bw_count >= self.BW_FLUSH_PACKETS
+                or now - self._bw_last_flush >= self.BW_FLUSH_INTERVAL_NS):
+            self._flush_bandwidth(now)
         
         # Token bucket check
         allowed, _ = self.bucket.consume(packet_size)
         
-        # Update protocol stats (with lock, but fast)
-        with self.proto_lock:
-            ps = self.proto_stats[proto]
-            ps.packets += 1
-            ps.bytes += packet_size
-            if not allowed:
-                ps.dropped += 1
-                ps.dropped_bytes += packet_size
+        # Update protocol stats (local, no lock — flushed periodically)
+        L = self._local_udp if is_udp else self._local_tcp
+        L[0] += 1
+        L[1] += packet_size
+        if not allowed:
+            L[2] += 1
+            L[3] += packet_size
+        
+        # Flood mode: per-IP tracking, logging and WHOIS only on sampled
+        # packets. Each sample stands for LOG_SAMPLE_RATE packets so per-IP
+        # totals (and the thresholds built on them) stay unbiased; one-shot
+        # spoofed sources mostly never reach ip_stats.
+        if self.flood_mode:
+            if packet_counter % self.LOG_SAMPLE_RATE:
+                return not allowed
+            weight = self.LOG_SAMPLE_RATE
+        else:
+            weight = 1
         
         # Update IP stats (lightweight)
-        now = time.perf_counter()
         with self.ip_lock:
-            if src_ip not in self.ip_stats:
-                self.ip_stats[src_ip] = IPStats(
-                    first_seen=now,
-                    protocol=proto
-                )
-            ips = self.ip_stats[src_ip]
-            ips.packets += 1
-            ips.bytes += packet_size
+            ip_stats = self.ip_stats
+            ips = ip_stats.get(src_ip)
+            if ips is None:
+                if len(ip_stats) >= self.MAX_TRACKED_IPS:
+                    self._evict_ip_stats()
+                # An evicted top offender resumes its existing counters
+                ips = self._top_dropped.get(src_ip)
+                if ips is None:
+                    if self._ipstats_pool:
+                        ips = self._ipstats_pool.pop()
+                        ips.reset(now)
+                    else:
+                        ips = IPStats(first_seen=now)
+                ip_stats[src_ip] = ips
+            else:
+                ip_stats.move_to_end(src_ip)
+            ips.packets += weight
+            ips.bytes += packet_size * weight
             ips.last_seen = now
             ips.protocol = proto
             if not allowed:
-                ips.dropped += 1
+                ips.dropped += weight
+                if ips.dropped > self._top_dropped_threshold:
+                    self._track_top_dropped(src_ip, ips)
         
         # Sampled logging (not every packet!)
-        if not allowed and self.packet_counter % self.LOG_SAMPLE_RATE == 0:
+        if not allowed and packet_counter % self.LOG_SAMPLE_RATE == 0:
             self._queue_log_event(src_ip, proto, src_port, packet_size)
         
         # Queue for WHOIS (background, not blocking)
-        if self.packet_counter % 500 == 0:
+        if packet_counter % 500 == 0:
             self.intel.get_or_create_profile(src_ip)
         
         # Return True to DROP if not allowed
         return not allowed
     
+    def _evict_ip_stats(self):
+        """
+        Evict the least recently seen IP (caller holds ip_lock).
+        
+        Its IPStats goes to the pool unless _top_dropped still holds it.
+        """
+        ip, ips = self.ip_stats.popitem(last=False)
+        if (self._top_dropped.get(ip) is not ips
+                and len(self._ipstats_pool) < self.IPSTATS_POOL_SIZE):
+            self._ipstats_pool.append(ips)
+    
+    def _track_top_dropped(self, ip: str, ips: IPStats):
+        """
+        Add IP to top-offender candidates (caller holds ip_lock).
+        
+        When candidates reach 2*K, prune to the K largest and raise the
+        threshold to the smallest kept count — amortized O(1) per drop.
+        """
+        top = self._top_dropped
+        top[ip] = ips
+        if len(top) >= 2 * self.TOP_DROPPED_K:
+            keep = heapq.nlargest(
+                self.TOP_DROPPED_K, top.items(), key=lambda x: x[1].dropped
+            )
+            self._top_dropped = dict(keep)
+            self._top_dropped_threshold = keep[-1][1].dropped
+    
+    def _flush_proto_stats(self):
+        """Merge recv-thread protocol counters into proto_stats (recv thread only)."""
+        with self.proto_lock:
+            for ps, L in ((self.udp_stats, self._local_udp),
+                          (self.tcp_stats, self._local_tcp)):
+                if L[0]:
+                    ps.packets += L[0]
+                    ps.bytes += L[1]
+                    ps.dropped += L[2]
+                    ps.dropped_bytes += L[3]
+                    L[0] = L[1] = L[2] = L[3] = 0
+    
+    def _flush_bandwidth(self, now: int):
+        """Push accumulated bytes to the bandwidth monitor."""
+        self.monitor.add_sample(self._bw_accum)
+        self._bw_accum = 0
+        self._bw_count = 0
+        self._bw_last_flush = now
+    
     def _queue_log_event(self, ip: str, proto: str, port: int, size: int):
         """Queue log event (non-blocking, sampled)."""
-        # Use the async logger
+        # Use the async logger (timestamp formatted on writer thread)
         event = ThreatEvent(
-            timestamp=datetime.now().isoformat(),
+            timestamp=time.time_ns(),
             event_type="throttle",
             ip=ip,
             speed_mbps=self.monitor.get_speed_mbps(),
@@ -312,23 +453,25 @@ class ShieldEngine:
         bucket_stats = self.bucket.get_stats()
         
         with self.proto_lock:
-            udp_stats = self.proto_stats.get("udp", ProtocolStats())
-            tcp_stats = self.proto_stats.get("tcp", ProtocolStats())
+            udp = self.udp_stats
+            tcp = self.tcp_stats
+            udp_packets, udp_dropped = udp.packets, udp.dropped
+            tcp_packets, tcp_dropped = tcp.packets, tcp.dropped
         
         return {
             'speed_mbps': self.monitor.get_speed_mbps(),
             'max_bandwidth': self.config.max_bandwidth_mbps,
-            'total_mb': bucket_stats['total_mb'],
-            'packets': bucket_stats['packets'],
-            'dropped': bucket_stats['throttled'],
-            'dropped_mb': bucket_stats['throttled_mb'],
+            'total_mb': bucket_stats.total_mb,
+            'packets': bucket_stats.packets,
+            'dropped': bucket_stats.throttled,
+            'dropped_mb': bucket_stats.throttled_mb,
             'unique_ips': len(self.ip_stats),
             'flood_mode': self.flood_mode,
             # Protocol breakdown
-            'udp_packets': udp_stats.packets,
-            'udp_dropped': udp_stats.dropped,
-            'tcp_packets': tcp_stats.packets,
-            'tcp_dropped': tcp_stats.dropped,
+            'udp_packets': udp_packets,
+            'udp_dropped': udp_dropped,
+            'tcp_packets': tcp_packets,
+            'tcp_dropped': tcp_dropped,
         }
     
     def _save_watchlist_async(self):
@@ -356,10 +499,11 @@ class ShieldEngine:
         
         self.intel.stop()
         self._save_watchlist_async()
+        self._flush_proto_stats()
         
         # Log final protocol stats
         with self.proto_lock:
-            for proto, stats in self.proto_stats.items():
+            for proto, stats in (("udp", self.udp_stats), ("tcp", self.tcp_stats)):
                 logger.info(
                     f"{proto.upper()}: {stats.packets} pkts, "
                     f"{stats.dropped} dropped ({stats.dropped_bytes/1024/1024:.1f} MB)"
@@ -370,7 +514,13 @@ class ShieldEngine:
         self.running = False
     
     def get_session_summary(self) -> dict:
-        """Get final session summary."""
+        """
+        Get final session summary.
+        
+        Reads the merged protocol stats only: the recv thread's local
+        counters are not touched here, so a live engine may be up to one
+        flush tick behind (exact after shutdown).
+        """
         stats = self._get_stats()
         
         with self.proto_lock:
@@ -381,16 +531,14 @@ class ShieldEngine:
                     'dropped': ps.dropped,
                     'dropped_bytes': ps.dropped_bytes,
                 }
-                for proto, ps in self.proto_stats.items()
+                for proto, ps in (("udp", self.udp_stats), ("tcp", self.tcp_stats))
             }
         
         # Top offenders
         with self.ip_lock:
-            top_dropped = sorted(
-                self.ip_stats.items(),
-                key=lambda x: x[1].dropped,
-                reverse=True
-            )[:10]
+            top_dropped = heapq.nlargest(
+                10, self._top_dropped.items(), key=lambda x: x[1].dropped
+            )
         
         return {
             'start_time': self.start_time,
@@ -6,6 +6,21 @@ Classic token bucket algorithm for bandwidth limiting.
 
 import time
 from threading import Lock
+from typing import NamedTuple
+
+# Rate or capacity at/above this is treated as "no limit" (monitoring only)
+UNLIMITED_BYTES = 1e15
+
+
+class BucketStats(NamedTuple):
+    """Immutable TokenBucket statistics snapshot (use ._asdict() for JSON)."""
+    total_bytes: int
+    total_mb: float
+    throttled_bytes: int
+    throttled_mb: float
+    packets: int
+    throttled: int
+    current_tokens: float
 
 
 class TokenBucket:
@@ -17,6 +32,13 @@ class TokenBucket:
     If insufficient tokens, packet is throttled.
     """
     
+    # No per-instance __dict__: smaller objects, faster attribute access
+    __slots__ = (
+        '_rate', '_inv_rate', '_rate_per_ns',
+        'bucket_size', '_state', '_lock',
+        '_total_bytes', '_throttled_bytes', '_packet_count', '_throttled_count',
+    )
+    
     def __init__(self, rate_bytes_per_sec: float, bucket_size_bytes: float):
         """
         Initialize token bucket.
@@ -30,10 +52,11 @@ class TokenBucket:
         if bucket_size_bytes <= 0:
             raise ValueError("bucket_size_bytes must be positive")
         
-        self.rate = rate_bytes_per_sec
         self.bucket_size = bucket_size_bytes
-        self.tokens = bucket_size_bytes  # Start full
-        self.last_update = time.perf_counter()
+        self.rate = rate_bytes_per_sec  # Sets _rate, _inv_rate, _rate_per_ns
+        # (tokens, last_update_ns) rebound as one tuple so lock-free
+        # readers always see a matching pair. Start full.
+        self._state = (bucket_size_bytes, time.monotonic_ns())
         self._lock = Lock()
         
         # Statistics
@@ -42,13 +65,42 @@ class TokenBucket:
         self._packet_count = 0
         self._throttled_count = 0
     
+    @property
+    def tokens(self) -> float:
+        """Tokens available at the last update."""
+        return self._state[0]
+    
+    @property
+    def last_update_ns(self) -> int:
+        """Monotonic timestamp of the last refill."""
+        return self._state[1]
+    
+    @property
+    def rate(self) -> float:
+        """Refill rate in bytes/sec."""
+        return self._rate
+    
+    @rate.setter
+    def rate(self, value: float):
+        # Wait times multiply by the cached reciprocal instead of dividing
+        self._rate = value
+        self._inv_rate = 1.0 / value
+        self._rate_per_ns = value * 1e-9
+        
+        # Unlimited buckets get a consume() with no refill math at all.
+        # Same slot layout, so the class can be swapped in place and a
+        # runtime rate change switches behaviour in either direction.
+        if type(self) in (TokenBucket, _UnlimitedTokenBucket):
+            unlimited = value >= UNLIMITED_BYTES or self.bucket_size >= UNLIMITED_BYTES
+            self.__class__ = _UnlimitedTokenBucket if unlimited else TokenBucket
+    
     def consume(self, num_bytes: int) -> tuple[bool, float]:
         """
         Attempt to consume tokens for a packet.
         
         Args:
             num_bytes: Size of packet in bytes
-            
+        
         Returns:
             (allowed, wait_time): 
                 - allowed: True if packet can pass immediately
@@ -57,47 +109,64 @@ class TokenBucket:
         if num_bytes < 0:
             raise ValueError("num_bytes cannot be negative")
         
+        # Clock read outside the lock keeps the critical section to pure
+        # arithmetic. A thread that read the clock earlier than the last
+        # writer sees a negative delta and simply skips the refill.
+        now = time.monotonic_ns()
+        
         with self._lock:
-            now = time.perf_counter()
-            elapsed = now - self.last_update
-            self.last_update = now
+            # Work on local copies: one state load and one store per call
+            tokens, last = self._state
             
-            # Refill tokens
-            self.tokens = min(
-                self.bucket_size, 
-                self.tokens + elapsed * self.rate
-            )
+            # Lazy refill: a full bucket just moves the clock; below one
+            # byte of refill, last is left alone so the fraction
+            # keeps accumulating instead of being discarded
+            if tokens >= self.bucket_size:
+                last = now
+            else:
+                delta = (now - last) * self._rate_per_ns
+                if delta >= 1.0:
+                    last = now
+                    tokens += delta
+                    if tokens > self.bucket_size:
+                        tokens = self.bucket_size
             
             # Update stats
             self._packet_count += 1
             self._total_bytes += num_bytes
             
-            if self.tokens >= num_bytes:
+            if tokens >= num_bytes:
                 # Sufficient tokens - allow
-                self.tokens -= num_bytes
+                self._state = (tokens - num_bytes, last)
                 return True, 0.0
-            else:
-                # Insufficient - throttle
-                self._throttled_count += 1
-                self._throttled_bytes += num_bytes
-                
-                # Calculate wait time
-                needed = num_bytes - self.tokens
-                wait_time = needed / self.rate
-                return False, wait_time
+            
+            # Insufficient - throttle
+            self._state = (tokens, last)
+            self._throttled_count += 1
+            self._throttled_bytes += num_bytes
+            
+            # Calculate wait time
+            return False, (num_bytes - tokens) * self._inv_rate
     
-    def get_stats(self) -> dict:
-        """Get current statistics."""
-        with self._lock:
-            return {
-                'total_bytes': self._total_bytes,
-                'total_mb': self._total_bytes / (1024 * 1024),
-                'throttled_bytes': self._throttled_bytes,
-                'throttled_mb': self._throttled_bytes / (1024 * 1024),
-                'packets': self._packet_count,
-                'throttled': self._throttled_count,
-                'current_tokens': self.tokens,
-            }
+    def get_stats(self) -> BucketStats:
+        """
+        Get current statistics.
+        
+        Lock-free: counters only grow (between resets) and each read is a
+        single attribute load, so the snapshot may be a packet or two
+        apart between fields but never blocks consume().
+        """
+        total_bytes = self._total_bytes
+        throttled_bytes = self._throttled_bytes
+        return BucketStats(
+            total_bytes,
+            total_bytes / (1024 * 1024),
+            throttled_bytes,
+            throttled_bytes / (1024 * 1024),
+            self._packet_count,
+            self._throttled_count,
+            self._state[0],
+        )
     
     def reset_stats(self):
         """Reset statistics counters."""
@@ -106,3 +175,19 @@ class TokenBucket:
             self._throttled_bytes = 0
             self._packet_count = 0
             self._throttled_count = 0
+
+
+class _UnlimitedTokenBucket(TokenBucket):
+    """TokenBucket for unlimited rate/capacity: counts, never throttles."""
+    
+    __slots__ = ()
+    
+    def consume(self, num_bytes: int) -> tuple[bool, float]:
+        """Count the packet and allow it."""
+        if num_bytes < 0:
+            raise ValueError("num_bytes cannot be negative")
+        
+        with self._lock:
+            self._packet_count += 1
+            self._total_bytes += num_bytes
+        return True, 0.0
@@ -2,6 +2,9 @@
 NetShield Test Fixtures
 =======================
 Shared pytest fixtures for all test modules.
+
+Fixtures that no test mutates are session-scoped; anything a test
+modifies (test_config, sample_ip_profile) stays function-scoped.
 """
 
 import pytest
@@ -21,7 +24,7 @@ from netshield.models import IPProfile, ThreatEvent
 # CONFIG FIXTURES
 # ============================================================================
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def default_config():
     """Default NetShield configuration."""
     return NetShieldConfig()
@@ -40,7 +43,7 @@ def test_config():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def universal_config():
     """Universal mode configuration."""
     return NetShieldConfig(
@@ -70,7 +73,7 @@ def sample_ip_profile():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def high_risk_profile():
     """High-risk IP profile for testing."""
     return IPProfile(
@@ -87,7 +90,7 @@ def high_risk_profile():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_event():
     """Sample threat event for testing."""
     return ThreatEvent(
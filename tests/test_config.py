@@ -47,39 +47,22 @@ class TestConfigDefaults:
 class TestConfigValidation:
     """Tests for configuration validation (Fix #5)."""
     
-    def test_bandwidth_bounds_min_rejected(self):
-        """Bandwidth below minimum should fail validation."""
-        config = NetShieldConfig(max_bandwidth_mbps=0.5)
+    @pytest.mark.parametrize("value,should_fail", [
+        (0.5, True),
+        (2000.0, True),
+        (MIN_BANDWIDTH_MBPS, False),
+        (MAX_BANDWIDTH_MBPS, False),
+    ])
+    def test_bandwidth_bounds(self, value, should_fail):
+        """Bandwidth outside [MIN, MAX] should fail; bounds should pass."""
+        config = NetShieldConfig(max_bandwidth_mbps=value)
         errors = config.validate()
-        assert any('max_bandwidth_mbps' in e for e in errors)
+        assert any('max_bandwidth_mbps' in e for e in errors) == should_fail
     
-    def test_bandwidth_bounds_max_rejected(self):
-        """Bandwidth above maximum should fail validation."""
-        config = NetShieldConfig(max_bandwidth_mbps=2000.0)
-        errors = config.validate()
-        assert any('max_bandwidth_mbps' in e for e in errors)
-    
-    def test_bandwidth_at_min_valid(self):
-        """Bandwidth at minimum should pass."""
-        config = NetShieldConfig(max_bandwidth_mbps=MIN_BANDWIDTH_MBPS)
-        errors = config.validate()
-        assert not any('max_bandwidth_mbps' in e for e in errors)
-    
-    def test_bandwidth_at_max_valid(self):
-        """Bandwidth at maximum should pass."""
-        config = NetShieldConfig(max_bandwidth_mbps=MAX_BANDWIDTH_MBPS)
-        errors = config.validate()
-        assert not any('max_bandwidth_mbps' in e for e in errors)
-    
-    def test_burst_bounds_min_rejected(self):
-        """Burst below minimum should fail."""
-        config = NetShieldConfig(burst_size_mb=0.1)
-        errors = config.validate()
-        assert any('burst_size_mb' in e for e in errors)
-    
-    def test_burst_bounds_max_rejected(self):
-        """Burst above maximum should fail."""
-        config = NetShieldConfig(burst_size_mb=500.0)
+    @pytest.mark.parametrize("value", [0.1, 500.0])
+    def test_burst_bounds_rejected(self, value):
+        """Burst outside bounds should fail."""
+        config = NetShieldConfig(burst_size_mb=value)
         errors = config.validate()
         assert any('burst_size_mb' in e for e in errors)
     
@@ -89,12 +72,12 @@ class TestConfigValidation:
         errors = config.validate()
         assert any('mode' in e.lower() for e in errors)
     
-    def test_valid_modes_accepted(self):
+    @pytest.mark.parametrize("mode", [MODE_VRCHAT, MODE_UNIVERSAL, MODE_CUSTOM])
+    def test_valid_modes_accepted(self, mode):
         """All valid modes should pass."""
-        for mode in [MODE_VRCHAT, MODE_UNIVERSAL, MODE_CUSTOM]:
-            config = NetShieldConfig(mode=mode)
-            errors = config.validate()
-            assert not any('mode' in e.lower() for e in errors)
+        config = NetShieldConfig(mode=mode)
+        errors = config.validate()
+        assert not any('mode' in e.lower() for e in errors)
     
     def test_watchlist_threshold_bounds(self):
         """Watchlist threshold must be 0-100."""
@@ -186,6 +186,19 @@ class TestCustomScorer:
         score, reasons = custom_scorer.calculate(profile)
         assert score >= 15
         assert any("evil" in r.lower() for r in reasons)
+    
+    def test_asn_reason_uses_keyword_order(self, custom_scorer):
+        """Reported keyword should be first in keyword order, not in the text."""
+        first, second = list(custom_scorer.suspicious_asn_keywords)
+        profile = IPProfile(
+            ip="1.2.3.4",
+            first_seen="2024-01-01",
+            last_seen="2024-01-01",
+            asn_description=f"{second} and {first} hosting"
+        )
+        
+        score, reasons = custom_scorer.calculate(profile)
+        assert f"Suspicious ASN keyword: {first}" in reasons
 
 
 class TestScorerProfileUpdate:
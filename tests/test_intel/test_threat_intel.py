@@ -153,6 +153,18 @@ class TestLRUCache:
                 f.result()
         
         assert len(errors) == 0
+    
+    def test_lru_cache_sharded_respects_max_size(self):
+        """Large caches are sharded but never exceed max_size overall."""
+        cache = LRUCache(max_size=20000)
+        assert len(cache._shards) == LRUCache.MAX_SHARDS
+        
+        for i in range(25000):
+            key = f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}"
+            cache.put(key, IPProfile(ip=key, first_seen="", last_seen=""))
+        
+        assert len(cache) <= 20000
+        assert cache.get("10.0.97.167") is not None  # most recent put
 
 
 class TestRateLimiter:
@@ -194,6 +206,19 @@ class TestRateLimiter:
         
         # Should be able to acquire again
         assert limiter.acquire(timeout=0.1) is True
+    
+    def test_rate_limiter_sleeps_until_next_token(self):
+        """Blocked acquire should wake when a token is due, not poll."""
+        limiter = RateLimiter(rate_per_sec=10.0)
+        
+        for _ in range(10):
+            limiter.acquire(timeout=0.01)
+        
+        start = time.monotonic()
+        assert limiter.acquire(timeout=1.0) is True
+        elapsed = time.monotonic() - start
+        
+        assert 0.05 <= elapsed < 0.5
 
 
 class TestThreatIntel:
@@ -212,6 +237,16 @@ class TestThreatIntel:
         assert intel.get_or_create_profile("10.0.0.1") is None
         assert intel.get_or_create_profile("127.0.0.1") is None
     
+    def test_private_check_memoized(self, intel):
+        """Repeat private-IP checks should hit the cache."""
+        from netshield.intel.threat_intel import _is_private_ip
+        
+        _is_private_ip.cache_clear()
+        for _ in range(3):
+            assert intel.get_or_create_profile("10.0.0.1") is None
+        
+        assert _is_private_ip.cache_info().hits >= 2
+    
     def test_public_ip_creates_profile(self, intel):
         """Public IPs should create profile."""
         profile = intel.get_or_create_profile("8.8.8.8")
@@ -225,6 +260,18 @@ class TestThreatIntel:
         
         assert profile1 is profile2
     
+    def test_profile_timestamps_cached_per_second(self, intel):
+        """Seen-timestamps should reuse the per-second cached ISO string."""
+        from unittest.mock import patch
+        
+        with patch('netshield.models.time.time', return_value=1_700_000_000.2):
+            profile = intel.get_or_create_profile("8.8.8.8")
+        with patch('netshield.models.time.time', return_value=1_700_000_000.7):
+            intel.get_or_create_profile("8.8.8.8")
+        
+        assert profile.last_seen is profile.first_seen
+        assert profile.first_seen.startswith("2023-11-")
+    
     def test_update_stats(self, intel):
         """update_stats should update profile."""
         intel.get_or_create_profile("8.8.8.8")
@@ -84,6 +84,18 @@ class TestEventLoggerBasic:
             assert "Yes" in row  # Throttled
         finally:
             logger.stop()
+    
+    def test_json_fallback_matches_orjson(self, sample_event, monkeypatch):
+        """Stdlib fallback should serialize exactly like orjson."""
+        pytest.importorskip("orjson")
+        from netshield.loggers import event_logger
+        
+        data = sample_event.to_dict()
+        data['note'] = "кириллица"
+        fast = event_logger._json_bytes(data)
+        
+        monkeypatch.setattr(event_logger, 'ORJSON_AVAILABLE', False)
+        assert event_logger._json_bytes(data) == fast
 
 
 class TestAsyncLogging:
@@ -137,6 +149,73 @@ class TestAsyncLogging:
             assert len(lines) == 10
         finally:
             logger.stop()
+    
+    def test_distinct_events_not_collapsed(self, temp_log_dir):
+        """Events sharing type/ip but differing in data stay distinct."""
+        logger = EventLogger(temp_log_dir)
+        
+        try:
+            for speed in (1.0, 2.0):
+                logger.log_event(ThreatEvent(
+                    timestamp="2024-01-01",
+                    event_type="test",
+                    ip="8.8.8.8",
+                    speed_mbps=speed,
+                    threat_score=50
+                ))
+            logger.flush()
+            
+            with open(logger.events_file, 'r') as f:
+                speeds = [json.loads(line)['speed_mbps'] for line in f]
+            
+            assert speeds == [1.0, 2.0]
+        finally:
+            logger.stop()
+    
+    def test_event_snapshotted_at_enqueue(self, temp_log_dir):
+        """Changes made after log_event() should not reach the queued record."""
+        logger = EventLogger(temp_log_dir)
+        
+        try:
+            event = ThreatEvent(
+                timestamp="2024-01-01",
+                event_type="test",
+                ip="8.8.8.8",
+                speed_mbps=1.0,
+                threat_score=50,
+                details={"port": 1}
+            )
+            logger.log_event(event)
+            event.speed_mbps = 2.0
+            event.details["port"] = 2
+            logger.log_event(event)  # Same object re-queued after the change
+            logger.flush()
+            
+            with open(logger.events_file, 'r') as f:
+                records = [json.loads(line) for line in f]
+            
+            assert [r['speed_mbps'] for r in records] == [1.0, 2.0]
+            assert [r['details']['port'] for r in records] == [1, 2]
+        finally:
+            logger.stop()
+    
+    def test_flush_returns_after_batch_written(self, temp_log_dir, sample_event, sample_ip_profile):
+        """flush() should not return until the whole batch is on disk."""
+        logger = EventLogger(temp_log_dir)
+        
+        try:
+            for _ in range(500):
+                logger.log_event(sample_event)
+                logger.log_traffic(sample_ip_profile, 1.0, False)
+            
+            logger.flush()
+            
+            with open(logger.events_file, 'r') as f:
+                assert len(f.readlines()) == 500
+            with open(logger.traffic_file, 'r') as f:
+                assert len(f.readlines()) == 501  # + header
+        finally:
+            logger.stop()
 
 
 class TestHMACIntegrity:
@@ -163,7 +242,8 @@ class TestHMACIntegrity:
                 data = json.loads(f.readline())
             
             assert '_sig' in data
-            assert len(data['_sig']) == 16  # Truncated HMAC
+            assert data['_sig'].startswith("b2:")
+            assert len(data['_sig']) == 19  # Version prefix + 64-bit tag
         finally:
             logger.stop()
     
@@ -217,6 +297,60 @@ class TestHMACIntegrity:
             assert len(row[-1]) > 0  # Signature present
         finally:
             logger.stop()
+    
+    def test_watchlist_signature_verifies(self, temp_log_dir, sample_ip_profile, integrity_secret):
+        """Saved watchlist should pass verify_integrity; tampering should not."""
+        logger = EventLogger(temp_log_dir, enable_integrity=True)
+        
+        try:
+            logger.save_watchlist([sample_ip_profile])
+            assert logger.verify_integrity(logger.watchlist_file) is True
+            
+            with open(logger.watchlist_file, 'r') as f:
+                data = json.load(f)
+            data[0]['threat_score'] += 50
+            with open(logger.watchlist_file, 'w') as f:
+                json.dump(data, f)
+            
+            assert logger.verify_integrity(logger.watchlist_file) is False
+        finally:
+            logger.stop()
+    
+    def test_long_secret_accepted(self, temp_log_dir, monkeypatch):
+        """Secrets longer than the BLAKE2b key limit should still sign."""
+        monkeypatch.setenv('NETSHIELD_LOG_SECRET', 'k' * 200)
+        logger = EventLogger(temp_log_dir, enable_integrity=True)
+        
+        try:
+            assert len(logger._compute_sig("payload")) == 19
+        finally:
+            logger.stop()
+    
+    def test_legacy_watchlist_signature_verifies(self, temp_log_dir, sample_ip_profile, integrity_secret):
+        """Watchlists signed with the old HMAC-SHA256 tags should still verify."""
+        import hashlib
+        import hmac
+        
+        logger = EventLogger(temp_log_dir, enable_integrity=True)
+        
+        try:
+            entry = sample_ip_profile.to_dict()
+            entry_str = json.dumps(entry, sort_keys=True)
+            entry['_sig'] = hmac.new(
+                integrity_secret, entry_str.encode('utf-8'), hashlib.sha256
+            ).hexdigest()[:16]
+            with open(logger.watchlist_file, 'w') as f:
+                json.dump([entry], f)
+            
+            assert logger.verify_integrity(logger.watchlist_file) is True
+            
+            entry['threat_score'] += 50
+            with open(logger.watchlist_file, 'w') as f:
+                json.dump([entry], f)
+            
+            assert logger.verify_integrity(logger.watchlist_file) is False
+        finally:
+            logger.stop()
 
 
 class TestAtomicWrites:
@@ -271,3 +405,27 @@ class TestLoggerCleanup:
             lines = f.readlines()
         
         assert len(lines) >= 1  # At least some written
+    
+    def test_stop_drains_queue(self, temp_log_dir, sample_event):
+        """stop() should write every queued event before exiting."""
+        logger = EventLogger(temp_log_dir)
+        
+        for _ in range(50):
+            logger.log_event(sample_event)
+        
+        logger.stop()
+        
+        with open(logger.events_file, 'r') as f:
+            lines = f.readlines()
+        
+        assert len(lines) == 50
+    
+    def test_stop_closes_log_files(self, temp_log_dir):
+        """stop() should close the long-lived append handles."""
+        logger = EventLogger(temp_log_dir)
+        events_fh = logger._events_fh
+        
+        logger.stop()
+        
+        assert events_fh.closed
+        assert logger._events_fh is None
@@ -8,12 +8,14 @@ Security Fixes Tested:
 """
 
 import pytest
+from unittest.mock import patch
 
 from netshield.models import (
     IPProfile,
     ThreatEvent,
     sanitize_string,
     sanitize_ip,
+    iso_now_cached,
     MAX_FIELD_LENGTH,
 )
 
@@ -65,6 +67,11 @@ class TestSanitizeString:
         result = sanitize_string(unicode_str)
         assert result == unicode_str
     
+    def test_sanitize_keeps_non_printable_non_control(self):
+        """Non-printable chars outside the control ranges are kept."""
+        result = sanitize_string("a\u200bb\x85c")  # ZWSP kept, NEL (C1) removed
+        assert result == "a\u200bbc"
+    
     def test_sanitize_custom_max_length(self):
         """Custom max length should work."""
         result = sanitize_string("abcdefghij", max_length=5)
@@ -94,6 +101,11 @@ class TestSanitizeIP:
         long_ip = "1" * 100
         result = sanitize_ip(long_ip)
         assert len(result) <= 45  # Max IPv6 length
+    
+    def test_sanitize_ip_rejects_empty_and_non_ascii_digits(self):
+        """Empty strings and non-ASCII digits should be invalid."""
+        assert sanitize_ip("") == "invalid"
+        assert sanitize_ip("١٩٢.١.١.١") == "invalid"  # Arabic-Indic digits
 
 
 class TestIPProfile:
@@ -137,6 +149,18 @@ class TestIPProfile:
         assert "\x00" not in sample_ip_profile.asn_description
         assert "\r" not in sample_ip_profile.network_name
     
+    def test_profile_country_interned(self):
+        """Equal country codes should share one string object."""
+        a = IPProfile(ip="1.1.1.1", first_seen="", last_seen="", country="".join(["U", "S"]))
+        b = IPProfile(ip="2.2.2.2", first_seen="", last_seen="")
+        b.update_whois("".join(["U", "S"]), "1", "", "", "", "")
+        
+        assert a.country is b.country
+    
+    def test_profile_has_no_instance_dict(self, sample_ip_profile):
+        """Slotted dataclass: no per-instance __dict__."""
+        assert not hasattr(sample_ip_profile, '__dict__')
+    
     def test_profile_to_dict(self, sample_ip_profile):
         """to_dict should return valid dictionary."""
         result = sample_ip_profile.to_dict()
@@ -212,6 +236,29 @@ class TestThreatEvent:
         assert result['event_type'] == sample_event.event_type
         assert result['speed_mbps'] == round(sample_event.speed_mbps, 2)
     
+    def test_event_ns_timestamp_formatted(self):
+        """Integer ns timestamp should be formatted as ISO in to_dict."""
+        event = ThreatEvent(
+            timestamp=1_700_000_000_000_000_000,
+            event_type="test",
+            ip="8.8.8.8",
+            speed_mbps=1.0,
+            threat_score=0
+        )
+        result = event.to_dict()
+        assert isinstance(result['timestamp'], str)
+        assert result['timestamp'].startswith("2023-11-")
+    
+    def test_iso_now_cached_same_second(self):
+        """Cached ISO timestamp is reused within one second."""
+        with patch('netshield.models.time.time', return_value=1_700_000_000.2):
+            first = iso_now_cached()
+        with patch('netshield.models.time.time', return_value=1_700_000_000.9):
+            second = iso_now_cached()
+        
+        assert first is second
+        assert first.startswith("2023-11-")
+    
     def test_event_speed_rounded(self):
         """Speed should be rounded to 2 decimals in to_dict."""
         event = ThreatEvent(
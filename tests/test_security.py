@@ -19,7 +19,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from netshield.ipc import (
     PacketData, Command, CommandType, StatsResponse,
     IPCServer, IPCClient,
-    HEADER_FORMAT, BUFFER_SIZE, MAX_PACKET_SIZE,
+    HEADER_FORMAT, BUFFER_SIZE, MAX_PACKET_SIZE, FRAME_SIZE,
     create_mock_ipc
 )
 
@@ -190,6 +190,11 @@ class TestCommandValidation:
         )
         assert cmd.validate() is False
     
+    def test_non_string_command_type(self):
+        """Non-string types from a crafted message should be rejected."""
+        cmd = Command.from_bytes(b'{"type": ["throttle_ip"]}')
+        assert cmd.validate() is False
+    
     def test_command_injection_attempt(self):
         """Command injection in type should fail."""
         cmd = Command(
@@ -276,6 +281,44 @@ class TestSerialization:
         msg_len = struct.unpack(HEADER_FORMAT, data[:4])[0]
         
         assert msg_len < BUFFER_SIZE
+    
+    def test_packet_roundtrip_ipv6(self):
+        """IPv6 addresses and all fields should roundtrip exactly."""
+        original = PacketData(
+            src_ip="2001:db8::1",
+            dst_ip="10.0.0.1",
+            src_port=1,
+            dst_port=65535,
+            protocol="tcp",
+            size=MAX_PACKET_SIZE,
+            timestamp=2**62,
+            is_inbound=False
+        )
+        
+        restored = PacketData.from_bytes(original.to_bytes()[4:])
+        
+        assert restored == original
+    
+    def test_malformed_frame_rejected(self):
+        """Truncated frames should raise ValueError, not decode."""
+        data = PacketData(
+            src_ip="1.2.3.4", dst_ip="5.6.7.8", src_port=1, dst_port=2,
+            protocol="udp", size=10, timestamp=0
+        ).to_bytes()[4:]
+        
+        with pytest.raises(ValueError):
+            PacketData.from_bytes(data[:-1])
+    
+    def test_unknown_protocol_fails_validation(self):
+        """Unknown protocols survive encoding only as invalid packets."""
+        packet = PacketData(
+            src_ip="1.2.3.4", dst_ip="5.6.7.8", src_port=1, dst_port=2,
+            protocol="icmp", size=10, timestamp=0
+        )
+        
+        restored = PacketData.from_bytes(packet.to_bytes()[4:])
+        
+        assert restored.validate() is False
 
 
 # =============================================================================
@@ -307,12 +350,84 @@ class TestMockIPC:
         assert received is not None
         assert received.src_ip == packet.src_ip
     
+    def test_batched_frames_split_on_read(self):
+        """Concatenated frames (send_packets) should parse back one by one."""
+        packets = [
+            PacketData(
+                src_ip=f"10.0.0.{i}", dst_ip="8.8.8.8", src_port=i,
+                dst_port=443, protocol="udp", size=100 + i, timestamp=i
+            )
+            for i in range(3)
+        ]
+        stream = b"".join(p.to_bytes() for p in packets)
+        
+        restored = []
+        while stream:
+            msg_len = struct.unpack(HEADER_FORMAT, stream[:4])[0]
+            restored.append(PacketData.from_bytes(stream[4:4 + msg_len]))
+            stream = stream[4 + msg_len:]
+        
+        assert restored == packets
+    
+    def test_pack_into_matches_to_bytes(self):
+        """pack_into should write the same frame to_bytes returns."""
+        packet = PacketData(
+            src_ip="2001:db8::1", dst_ip="10.0.0.1", src_port=5055,
+            dst_port=50000, protocol="udp", size=1200, timestamp=7
+        )
+        buffer = bytearray(2 * FRAME_SIZE)
+        
+        packet.pack_into(buffer, FRAME_SIZE)
+        
+        assert bytes(buffer[FRAME_SIZE:]) == packet.to_bytes()
+    
+    def test_pack_into_rejects_out_of_range(self):
+        """Unpackable field should raise ValueError, not struct.error."""
+        packet = PacketData(
+            src_ip="10.0.0.1", dst_ip="10.0.0.2", src_port=70000,
+            dst_port=1, protocol="udp", size=1, timestamp=0
+        )
+        
+        with pytest.raises(ValueError):
+            packet.pack_into(bytearray(FRAME_SIZE), 0)
+    
     def test_mock_empty_queue(self):
         """Empty queue should return None."""
         server, client = create_mock_ipc()
         
         received = client.receive_packet()
         assert received is None
+    
+    def test_client_drains_buffered_frames(self):
+        """receive_packets should return every whole frame already buffered."""
+        packets = [
+            PacketData(
+                src_ip=f"10.0.0.{i}", dst_ip="8.8.8.8", src_port=i,
+                dst_port=443, protocol="udp", size=100 + i, timestamp=i
+            )
+            for i in range(3)
+        ]
+        stream = bytearray(b"".join(p.to_bytes() for p in packets))
+        
+        def read_file(handle, n):
+            chunk = bytes(stream[:n])
+            del stream[:n]
+            return 0, chunk
+        
+        win32file = MagicMock()
+        win32file.ReadFile.side_effect = read_file
+        win32pipe = MagicMock()
+        win32pipe.PeekNamedPipe.side_effect = lambda h, n: (b"", len(stream), 0)
+        
+        client = IPCClient()
+        client._connected = True
+        with patch('netshield.ipc.win32file', win32file, create=True), \
+                patch('netshield.ipc.win32pipe', win32pipe, create=True), \
+                patch('netshield.ipc.pywintypes', MagicMock(error=OSError), create=True):
+            received = client.receive_packets()
+        
+        assert received == packets
+        assert not stream
 
 
 # =============================================================================
@@ -0,0 +1,151 @@
+"""
+Minimal Service Tests
+=====================
+Tests for admin service command handling and throttle checks.
+
+Tests:
+  - Throttle/unthrottle commands
+  - Throttle pre-filter (no false negatives)
+  - Command dispatch
+  - Accounting thread handoff
+"""
+
+import pytest
+from collections import deque
+from threading import Thread
+from unittest.mock import MagicMock
+
+from netshield.ipc import Command, CommandType
+from netshield.service import MinimalService
+
+
+@pytest.fixture
+def service(test_config):
+    """MinimalService without IPC/WinDivert started."""
+    return MinimalService(test_config)
+
+
+class TestThrottleFilter:
+    """Throttle pre-filter tests."""
+    
+    def test_clean_ip_not_throttled(self, service):
+        """Unknown IP should not be throttled."""
+        assert service._is_throttled("8.8.8.8") is False
+    
+    def test_throttle_command_marks_ip(self, service):
+        """THROTTLE_IP should make the IP throttled."""
+        service._handle_command(
+            Command(type=CommandType.THROTTLE_IP.value, target_ip="1.2.3.4")
+        )
+        
+        assert service._is_throttled("1.2.3.4") is True
+        assert "1.2.3.4" in service.throttled_ips
+    
+    def test_unthrottle_command_clears_ip(self, service):
+        """UNTHROTTLE_IP should clear the IP (filter rebuilt)."""
+        service._handle_command(
+            Command(type=CommandType.THROTTLE_IP.value, target_ip="1.2.3.4")
+        )
+        service._handle_command(
+            Command(type=CommandType.UNTHROTTLE_IP.value, target_ip="1.2.3.4")
+        )
+        
+        assert service._is_throttled("1.2.3.4") is False
+        assert "1.2.3.4" not in service.throttled_ips
+    
+    def test_no_false_negatives(self, service):
+        """Every throttled IP must pass the pre-filter."""
+        ips = [f"10.0.{i // 256}.{i % 256}" for i in range(1000)]
+        for ip in ips:
+            service._handle_command(
+                Command(type=CommandType.THROTTLE_IP.value, target_ip=ip)
+            )
+        
+        assert all(service._is_throttled(ip) for ip in ips)
+
+
+class TestCommandDispatch:
+    """Command dispatch table tests."""
+    
+    def test_shutdown_stops_service(self, service):
+        """SHUTDOWN should clear the running flag."""
+        service.running = True
+        
+        service._handle_command(Command(type=CommandType.SHUTDOWN.value))
+        
+        assert service.running is False
+    
+    def test_unknown_command_ignored(self, service):
+        """Unknown command type should be ignored, not raise."""
+        service._handle_command(Command(type="format_disk", target_ip="1.2.3.4"))
+        
+        assert service.throttled_ips == set()
+
+
+class TestAccounting:
+    """Recv -> accounting thread handoff tests."""
+    
+    def _packet(self):
+        packet = MagicMock()
+        packet.dst_addr = "192.168.1.10"
+        packet.src_port = 5055
+        packet.dst_port = 50000
+        packet.udp = True
+        return packet
+    
+    def test_account_updates_stats_immediately(self, service):
+        """Totals should be exact without waiting for a drain."""
+        service._account(self._packet(), "1.2.3.4", 100, False)
+        service._account(self._packet(), "1.2.3.4", 200, True)
+        
+        assert service.total_packets == 2
+        assert service.total_bytes == 300
+        assert service.throttled_count == 1
+        assert len(service._accounting_q) == 1
+        assert service._accounting_ready.is_set()
+    
+    def test_account_counts_queue_overflow(self, service):
+        """Entries evicted from a full queue should be counted and reported."""
+        service._accounting_q = deque(maxlen=2)
+        
+        for _ in range(5):
+            service._account(self._packet(), "1.2.3.4", 100, False)
+        
+        assert service.ipc_overflow == 3
+        assert service.total_packets == 5
+        assert service.get_stats().ipc_overflow == 3
+    
+    def test_only_forwarded_sent_to_worker(self, service):
+        """Dropped packets should not be forwarded to the worker."""
+        service.ipc = MagicMock()
+        service._account(self._packet(), "1.2.3.4", 100, False)
+        service._account(self._packet(), "5.6.7.8", 200, True)
+        
+        assert service._drain_accounting() == 1
+        
+        service.ipc.send_packets.assert_called_once()
+        sent_batch = service.ipc.send_packets.call_args[0][0]
+        assert len(sent_batch) == 1
+        sent = sent_batch[0]
+        assert sent.src_ip == "1.2.3.4"
+        assert sent.protocol == "udp"
+        assert sent.dst_port == 50000
+    
+    def test_loop_drains_then_exits_on_stop(self, service):
+        """Accounting thread should wake on new entries and exit once stopped."""
+        service.ipc = MagicMock()
+        service.running = True
+        thread = Thread(target=service._accounting_loop, daemon=True)
+        thread.start()
+        
+        service._account(self._packet(), "1.2.3.4", 100, False)
+        service.running = False
+        service._accounting_ready.set()
+        thread.join(timeout=2.0)
+        
+        assert not thread.is_alive()
+        service.ipc.send_packets.assert_called_once()
+    
+    def test_drain_empty_queue(self, service):
+        """Empty queue should be a no-op."""
+        assert service._drain_accounting() == 0
@@ -97,6 +97,16 @@ class TestBandwidthMonitorWindow:
         
         assert monitor.get_sample_count() == 0
         assert monitor.get_speed_mbps() == 0.0
+    
+    def test_running_total_after_expiry(self):
+        """Expired samples should leave the running total."""
+        monitor = BandwidthMonitor(window_sec=0.1)
+        
+        monitor.add_sample(5000)
+        time.sleep(0.15)
+        monitor.add_sample(1000)
+        
+        assert monitor.get_speed_bps() == pytest.approx(1000 / 0.1)
 
 
 class TestBandwidthMonitorPrecision:
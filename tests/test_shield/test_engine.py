@@ -12,9 +12,10 @@ Tests:
 
 import pytest
 import time
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
-from netshield.config import NetShieldConfig, MODE_VRCHAT, MODE_UNIVERSAL
+from netshield.config import NetShieldConfig, MODE_VRCHAT, MODE_UNIVERSAL, MODE_CUSTOM
 
 
 @pytest.fixture
@@ -24,6 +25,18 @@ def mock_logger():
     return logger
 
 
+@pytest.fixture
+def packet():
+    """
+    Plain-attribute UDP packet.
+    
+    Not a MagicMock: Mock attribute access would dominate the timings.
+    """
+    return SimpleNamespace(
+        raw=b'x' * 100, src_addr="8.8.8.8", src_port=5055, udp=True
+    )
+
+
 @pytest.fixture
 def engine_no_pydivert(test_config, mock_logger):
     """ShieldEngine with pydivert mocked out."""
@@ -68,125 +81,167 @@ class TestShieldEngineFilter:
 class TestDropStrategy:
     """DROP strategy tests (no sleep)."""
     
-    def test_process_returns_drop_when_throttled(self, engine_no_pydivert):
+    def test_process_returns_drop_when_throttled(self, engine_no_pydivert, packet):
         """Should return True (DROP) when bucket empty."""
         # Exhaust bucket
         engine_no_pydivert.bucket.consume(
             int(engine_no_pydivert.config.burst_size_mb * 1024 * 1024)
         )
         
-        # Create mock packet
-        mock_packet = MagicMock()
-        mock_packet.raw = b'x' * 1000
-        mock_packet.src_addr = "8.8.8.8"
-        mock_packet.src_port = 5055
-        mock_packet.udp = True
+        packet.raw = b'x' * 1000
         
-        should_drop = engine_no_pydivert._process_packet_fast(mock_packet, 1000)
+        should_drop = engine_no_pydivert._process_packet_fast(packet, 1000)
         
         assert should_drop is True
     
-    def test_process_returns_allow_when_ok(self, engine_no_pydivert):
+    def test_process_returns_allow_when_ok(self, engine_no_pydivert, packet):
         """Should return False (ALLOW) when bucket has tokens."""
-        mock_packet = MagicMock()
-        mock_packet.raw = b'x' * 100
-        mock_packet.src_addr = "8.8.8.8"
-        mock_packet.src_port = 5055
-        mock_packet.udp = True
-        
-        should_drop = engine_no_pydivert._process_packet_fast(mock_packet, 100)
+        should_drop = engine_no_pydivert._process_packet_fast(packet, 100)
         
         assert should_drop is False
     
-    def test_no_sleep_in_process(self, engine_no_pydivert):
+    def test_no_sleep_in_process(self, engine_no_pydivert, packet):
         """Processing should be fast (no sleep)."""
-        mock_packet = MagicMock()
-        mock_packet.raw = b'x' * 100
-        mock_packet.src_addr = "8.8.8.8"
-        mock_packet.src_port = 5055
-        mock_packet.udp = True
-        
-        start = time.perf_counter()
-        for _ in range(1000):
-            engine_no_pydivert._process_packet_fast(mock_packet, 100)
-        elapsed = time.perf_counter() - start
+        with patch('time.sleep') as mock_sleep:
+            start = time.perf_counter()
+            for _ in range(1000):
+                engine_no_pydivert._process_packet_fast(packet, 100)
+            elapsed = time.perf_counter() - start
         
-        # 1000 packets should complete in under 1 second (no sleep)
+        mock_sleep.assert_not_called()
         assert elapsed < 1.0
 
 
 class TestProtocolTracking:
     """Protocol separation tests."""
     
-    def test_udp_tracked_separately(self, engine_no_pydivert):
+    def test_udp_tracked_separately(self, engine_no_pydivert, packet):
         """UDP packets should be tracked under 'udp' key."""
-        mock_packet = MagicMock()
-        mock_packet.raw = b'x' * 100
-        mock_packet.src_addr = "8.8.8.8"
-        mock_packet.src_port = 5055
-        mock_packet.udp = True
+        engine_no_pydivert._process_packet_fast(packet, 100)
         
-        engine_no_pydivert._process_packet_fast(mock_packet, 100)
+        engine_no_pydivert._flush_proto_stats()
         
-        assert engine_no_pydivert.proto_stats['udp'].packets == 1
+        assert engine_no_pydivert.udp_stats.packets == 1
     
-    def test_tcp_tracked_separately(self, engine_no_pydivert):
+    def test_tcp_tracked_separately(self, engine_no_pydivert, packet):
         """TCP packets should be tracked under 'tcp' key."""
-        mock_packet = MagicMock()
-        mock_packet.raw = b'x' * 100
-        mock_packet.src_addr = "8.8.8.8"
-        mock_packet.src_port = 443
-        mock_packet.udp = False  # TCP
+        packet.src_port = 443
+        packet.udp = None  # TCP
+        
+        engine_no_pydivert._process_packet_fast(packet, 100)
         
-        engine_no_pydivert._process_packet_fast(mock_packet, 100)
+        engine_no_pydivert._flush_proto_stats()
         
-        assert engine_no_pydivert.proto_stats['tcp'].packets == 1
+        assert engine_no_pydivert.tcp_stats.packets == 1
     
-    def test_protocol_drop_tracked(self, engine_no_pydivert):
+    def test_protocol_drop_tracked(self, engine_no_pydivert, packet):
         """Dropped packets should be tracked per protocol."""
         # Mock bucket to always return "not allowed" (drop)
-        engine_no_pydivert.bucket.consume = MagicMock(return_value=(False, 0.1))
+        engine_no_pydivert.bucket = MagicMock()
+        engine_no_pydivert.bucket.consume.return_value = (False, 0.1)
         
-        mock_packet = MagicMock()
-        mock_packet.raw = b'x' * 1000
-        mock_packet.src_addr = "8.8.8.8"
-        mock_packet.src_port = 5055
-        mock_packet.udp = True
+        packet.raw = b'x' * 1000
         
-        engine_no_pydivert._process_packet_fast(mock_packet, 1000)
+        engine_no_pydivert._process_packet_fast(packet, 1000)
         
-        assert engine_no_pydivert.proto_stats['udp'].dropped == 1
+        engine_no_pydivert._flush_proto_stats()
+        
+        assert engine_no_pydivert.udp_stats.dropped == 1
+
+
+class TestModeSpecialization:
+    """Mode-invariant decisions resolved at construction."""
+    
+    def test_custom_mode_is_udp_only(self, mock_logger, packet):
+        """Custom mode (UDP filter) should count every packet as UDP."""
+        config = NetShieldConfig(mode=MODE_CUSTOM)
+        
+        with patch('netshield.shield.engine.PYDIVERT_AVAILABLE', True):
+            with patch('netshield.shield.engine.pydivert'):
+                from netshield.shield.engine import ShieldEngine
+                engine = ShieldEngine(config, mock_logger)
+        packet.udp = None  # Must not be probed
+        
+        engine._process_packet_fast(packet, 100)
+        engine._flush_proto_stats()
+        
+        assert engine._udp_only is True
+        assert engine.udp_stats.packets == 1
+    
+    def test_vrchat_mode_checks_protocol(self, engine_no_pydivert):
+        """VRChat filter captures TCP too, so protocol is probed."""
+        assert engine_no_pydivert._udp_only is False
 
 
 class TestIPTracking:
     """Lightweight IP tracking tests."""
     
-    def test_ip_stats_created(self, engine_no_pydivert):
+    def test_ip_stats_created(self, engine_no_pydivert, packet):
         """New IP should create stats entry."""
-        mock_packet = MagicMock()
-        mock_packet.raw = b'x' * 100
-        mock_packet.src_addr = "1.2.3.4"
-        mock_packet.src_port = 5055
-        mock_packet.udp = True
+        packet.src_addr = "1.2.3.4"
         
-        engine_no_pydivert._process_packet_fast(mock_packet, 100)
+        engine_no_pydivert._process_packet_fast(packet, 100)
         
         assert "1.2.3.4" in engine_no_pydivert.ip_stats
         assert engine_no_pydivert.ip_stats["1.2.3.4"].packets == 1
     
-    def test_ip_stats_accumulated(self, engine_no_pydivert):
+    def test_ip_stats_accumulated(self, engine_no_pydivert, packet):
         """Multiple packets from same IP should accumulate."""
-        mock_packet = MagicMock()
-        mock_packet.raw = b'x' * 100
-        mock_packet.src_addr = "1.2.3.4"
-        mock_packet.src_port = 5055
-        mock_packet.udp = True
+        packet.src_addr = "1.2.3.4"
         
         for _ in range(10):
-            engine_no_pydivert._process_packet_fast(mock_packet, 100)
+            engine_no_pydivert._process_packet_fast(packet, 100)
         
         assert engine_no_pydivert.ip_stats["1.2.3.4"].packets == 10
         assert engine_no_pydivert.ip_stats["1.2.3.4"].bytes == 1000
+    
+    def test_ip_stats_bounded_lru(self, engine_no_pydivert, packet):
+        """Past capacity, the least recently seen IP should be evicted."""
+        engine = engine_no_pydivert
+        engine.MAX_TRACKED_IPS = 2
+        
+        for ip in ("1.1.1.1", "2.2.2.2", "1.1.1.1", "3.3.3.3"):
+            packet.src_addr = ip
+            engine._process_packet_fast(packet, 100)
+        
+        assert list(engine.ip_stats) == ["1.1.1.1", "3.3.3.3"]
+        assert engine.ip_stats["1.1.1.1"].packets == 2
+    
+    def test_evicted_stats_recycled(self, engine_no_pydivert, packet):
+        """A new IP should reuse an evicted IPStats with zeroed counters."""
+        engine = engine_no_pydivert
+        engine.MAX_TRACKED_IPS = 1
+        
+        packet.src_addr = "1.1.1.1"
+        engine._process_packet_fast(packet, 100)
+        old_stats = engine.ip_stats["1.1.1.1"]
+        packet.src_addr = "2.2.2.2"
+        engine._process_packet_fast(packet, 50)
+        
+        assert engine.ip_stats["2.2.2.2"] is old_stats
+        assert old_stats.packets == 1
+        assert old_stats.bytes == 50
+    
+    def test_stats_objects_slotted(self, engine_no_pydivert):
+        """Per-IP/per-protocol stats should not carry a __dict__."""
+        from netshield.shield.engine import IPStats
+        
+        assert not hasattr(IPStats(), "__dict__")
+        assert not hasattr(engine_no_pydivert.udp_stats, "__dict__")
+
+
+class TestBandwidthBatching:
+    """Batched bandwidth monitor updates."""
+    
+    def test_samples_batched(self, engine_no_pydivert, packet):
+        """Monitor should get one sample per batch, not per packet."""
+        engine_no_pydivert.BW_FLUSH_INTERVAL_NS = 60 * 10**9  # Count-based flush only
+        
+        for _ in range(engine_no_pydivert.BW_FLUSH_PACKETS):
+            engine_no_pydivert._process_packet_fast(packet, 100)
+        
+        assert engine_no_pydivert.monitor.get_sample_count() == 1
+        assert engine_no_pydivert._bw_accum == 0
 
 
 class TestFloodMode:
@@ -200,6 +255,40 @@ class TestFloodMode:
         """Flood threshold should be 80% of max bandwidth."""
         expected = engine_no_pydivert.config.max_bandwidth_mbps * 0.8
         assert engine_no_pydivert.flood_threshold_mbps == expected
+    
+    def test_flood_mode_samples_ip_tracking(self, engine_no_pydivert, packet):
+        """In flood mode only sampled packets should update ip_stats."""
+        engine = engine_no_pydivert
+        engine.flood_mode = True
+        packet.src_addr = "1.2.3.4"
+        
+        for i in range(1, 2 * engine.LOG_SAMPLE_RATE + 1):
+            engine._process_packet_fast(packet, 100, i)
+        engine._flush_proto_stats()
+        
+        # Two samples, each weighted to stand for LOG_SAMPLE_RATE packets
+        ips = engine.ip_stats["1.2.3.4"]
+        assert ips.packets == 2 * engine.LOG_SAMPLE_RATE
+        assert ips.bytes == 2 * engine.LOG_SAMPLE_RATE * 100
+        assert engine.udp_stats.packets == 2 * engine.LOG_SAMPLE_RATE
+    
+    def test_flood_mode_preserves_drop_totals(self, engine_no_pydivert):
+        """Sampled drops should be scaled back up to the true count."""
+        engine = engine_no_pydivert
+        engine.flood_mode = True
+        engine.bucket = MagicMock()
+        engine.bucket.consume.return_value = (False, 0.1)
+        mock_packet = MagicMock()
+        mock_packet.src_addr = "1.2.3.4"
+        mock_packet.src_port = 5055
+        mock_packet.udp = True
+        
+        n = 5 * engine.LOG_SAMPLE_RATE
+        for i in range(1, n + 1):
+            engine._process_packet_fast(mock_packet, 100, i)
+        
+        assert engine.ip_stats["1.2.3.4"].dropped == n
+        assert engine.get_session_summary()['top_offenders'][0]['dropped'] == n
 
 
 class TestStats:
@@ -224,27 +313,56 @@ class TestStats:
 class TestSessionSummary:
     """Session summary tests."""
     
-    def test_summary_includes_protocols(self, engine_no_pydivert):
+    def test_summary_includes_protocols(self, engine_no_pydivert, packet):
         """Summary should include protocol breakdown."""
         # Add some data
-        mock_packet = MagicMock()
-        mock_packet.raw = b'x' * 100
-        mock_packet.src_addr = "8.8.8.8"
-        mock_packet.src_port = 5055
-        mock_packet.udp = True
-        
-        engine_no_pydivert._process_packet_fast(mock_packet, 100)
+        engine_no_pydivert._process_packet_fast(packet, 100)
         
         summary = engine_no_pydivert.get_session_summary()
         
         assert 'protocols' in summary
         assert 'udp' in summary['protocols']
     
+    def test_summary_stats_match_protocols(self, engine_no_pydivert, packet):
+        """Stats and protocol views should agree, before and after a flush."""
+        engine = engine_no_pydivert
+        for _ in range(5):
+            engine._process_packet_fast(packet, 100)
+        
+        # Summary must not drain the recv thread's local counters
+        summary = engine.get_session_summary()
+        assert summary['stats']['udp_packets'] == summary['protocols']['udp']['packets']
+        assert engine._local_udp[0] == 5
+        
+        engine._flush_proto_stats()  # Recv-thread tick
+        summary = engine.get_session_summary()
+        assert summary['stats']['udp_packets'] == 5
+        assert summary['protocols']['udp']['packets'] == 5
+    
     def test_summary_includes_top_offenders(self, engine_no_pydivert):
         """Summary should include top offenders list."""
         summary = engine_no_pydivert.get_session_summary()
         
         assert 'top_offenders' in summary
+    
+    def test_top_offenders_ordered_by_drops(self, engine_no_pydivert, packet):
+        """Top offenders should survive candidate pruning, highest first."""
+        engine_no_pydivert.bucket = MagicMock()
+        engine_no_pydivert.bucket.consume.return_value = (False, 0.1)
+        
+        # Many single-drop IPs force pruning; two heavy hitters must remain
+        for i in range(engine_no_pydivert.TOP_DROPPED_K * 3):
+            packet.src_addr = f"10.0.{i // 256}.{i % 256}"
+            engine_no_pydivert._process_packet_fast(packet, 100)
+        for ip, count in (("1.1.1.1", 5), ("2.2.2.2", 9)):
+            packet.src_addr = ip
+            for _ in range(count):
+                engine_no_pydivert._process_packet_fast(packet, 100)
+        
+        offenders = engine_no_pydivert.get_session_summary()['top_offenders']
+        
+        assert [o['ip'] for o in offenders[:2]] == ["2.2.2.2", "1.1.1.1"]
+        assert offenders[0]['dropped'] == 9
 
 
 class TestEngineImportError:
@@ -74,6 +74,69 @@ class TestTokenBucketBasic:
         
         allowed, _ = bucket.consume(1)  # Any more should fail
         assert allowed is False
+    
+    def test_no_instance_dict(self):
+        """Bucket should use __slots__ (no per-instance dict)."""
+        bucket = TokenBucket(
+            rate_bytes_per_sec=100.0,
+            bucket_size_bytes=100.0
+        )
+        
+        assert not hasattr(bucket, '__dict__')
+    
+    def test_unlimited_bucket_never_throttles(self):
+        """Unlimited rate should always allow and still count."""
+        bucket = TokenBucket(
+            rate_bytes_per_sec=float('inf'),
+            bucket_size_bytes=100.0
+        )
+        
+        for _ in range(5):
+            allowed, wait_time = bucket.consume(1000)
+            assert allowed is True
+            assert wait_time == 0.0
+        
+        stats = bucket.get_stats()
+        assert isinstance(bucket, TokenBucket)
+        assert stats.packets == 5
+        assert stats.total_bytes == 5000
+        assert stats.throttled == 0
+    
+    def test_unlimited_threshold_rate_never_throttles(self):
+        """Rate at/above UNLIMITED_BYTES should behave like inf."""
+        bucket = TokenBucket(
+            rate_bytes_per_sec=2e15,
+            bucket_size_bytes=100.0
+        )
+        
+        allowed, wait_time = bucket.consume(1000)
+        assert allowed is True
+        assert wait_time == 0.0
+        
+        bucket.reset_stats()
+        assert bucket.get_stats().packets == 0
+    
+    def test_rate_change_switches_unlimited(self):
+        """Setting rate at runtime should enable/disable the unlimited path."""
+        bucket = TokenBucket(
+            rate_bytes_per_sec=100.0,
+            bucket_size_bytes=100.0
+        )
+        bucket.consume(100)  # Empty bucket
+        
+        bucket.rate = float('inf')
+        allowed, wait_time = bucket.consume(1000)
+        assert allowed is True
+        assert wait_time == 0.0
+        
+        bucket.rate = 100.0
+        allowed, wait_time = bucket.consume(1000)
+        assert allowed is False
+        assert wait_time > 0
+        
+        stats = bucket.get_stats()
+        assert stats.packets == 3
+        assert stats.throttled == 1
 
 
 class TestTokenBucketValidation:
@@ -119,7 +182,7 @@ class TestTokenBucketStats:
         bucket.consume(300)
         
         stats = bucket.get_stats()
-        assert stats['total_bytes'] == 600
+        assert stats.total_bytes == 600
     
     def test_stats_packet_count(self):
         """packets should count consume calls."""
@@ -132,7 +195,7 @@ class TestTokenBucketStats:
             bucket.consume(10)
         
         stats = bucket.get_stats()
-        assert stats['packets'] == 10
+        assert stats.packets == 10
     
     def test_stats_throttled_count(self):
         """throttled should count denied consumes."""
@@ -146,7 +209,7 @@ class TestTokenBucketStats:
         bucket.consume(50)   # Throttled
         
         stats = bucket.get_stats()
-        assert stats['throttled'] == 2
+        assert stats.throttled == 2
     
     def test_stats_mb_conversion(self):
         """total_mb should be correct conversion."""
@@ -158,7 +221,7 @@ class TestTokenBucketStats:
         bucket.consume(1024 * 1024)  # 1 MB
         
         stats = bucket.get_stats()
-        assert stats['total_mb'] == pytest.approx(1.0, rel=0.01)
+        assert stats.total_mb == pytest.approx(1.0, rel=0.01)
     
     def test_stats_reset(self):
         """reset_stats should clear counters."""
@@ -171,8 +234,8 @@ class TestTokenBucketStats:
         bucket.reset_stats()
         
         stats = bucket.get_stats()
-        assert stats['total_bytes'] == 0
-        assert stats['packets'] == 0
+        assert stats.total_bytes == 0
+        assert stats.packets == 0
 
 
 class TestTokenBucketThreadSafety:
@@ -202,7 +265,7 @@ class TestTokenBucketThreadSafety:
         assert len(errors) == 0
         
         stats = bucket.get_stats()
-        assert stats['packets'] == 1000  # 10 threads * 100 each
+        assert stats.packets == 1000  # 10 threads * 100 each
     
     def test_concurrent_stats(self):
         """Concurrent stats access should be thread-safe."""
@@ -245,3 +308,18 @@ class TestWaitTimeCalculation:
         
         # Should wait ~0.5 seconds (50 bytes / 100 bytes/sec)
         assert wait_time == pytest.approx(0.5, rel=0.1)
+    
+    def test_wait_time_follows_rate_change(self):
+        """Changing rate at runtime should update wait time."""
+        bucket = TokenBucket(
+            rate_bytes_per_sec=100.0,
+            bucket_size_bytes=100.0
+        )
+        bucket.rate = 50.0
+        
+        bucket.consume(100)  # Empty bucket
+        
+        _, wait_time = bucket.consume(50)
+        
+        # Should wait ~1 second (50 bytes / 50 bytes/sec)
+        assert wait_time == pytest.approx(1.0, rel=0.1)
@@ -0,0 +1,92 @@
+"""
+Worker Tests
+============
+Tests for per-packet threat checks in the user-space worker.
+
+Tests:
+  - ML scoring hook (trained vs untrained model)
+  - Feature vector passed to the detector
+  - Receive queue overflow accounting
+"""
+
+import dataclasses
+from collections import deque
+
+import pytest
+from unittest.mock import MagicMock
+
+from netshield.ipc import PacketData
+from netshield.ml.features import TrafficFeatures
+from netshield.worker import IPTracker, Worker
+
+
+@pytest.fixture
+def worker(test_config, temp_log_dir):
+    """Worker without IPC connected or background threads started."""
+    config = dataclasses.replace(test_config, log_dir=temp_log_dir)
+    w = Worker(config)
+    yield w
+    w.logger.stop()
+    if w.intel:
+        w.intel.stop()
+
+
+def _packet(protocol: str = "udp") -> PacketData:
+    return PacketData(
+        src_ip="1.2.3.4",
+        dst_ip="192.168.1.10",
+        src_port=5055,
+        dst_port=50000,
+        protocol=protocol,
+        size=100,
+        timestamp=1,
+    )
+
+
+class TestMLScoring:
+    """ML hook in _quick_threat_check."""
+    
+    def test_untrained_model_disables_hook(self, worker):
+        """Untrained detector should not be called per packet."""
+        assert worker.ml is not None
+        assert worker.ml.is_trained is False
+        assert worker._ml_predict is None
+    
+    def test_trained_hook_gets_traffic_features(self, worker):
+        """Trained hook should receive a TrafficFeatures and add 0-30."""
+        worker._ml_predict = MagicMock(return_value=0.5)
+        tracker = IPTracker(first_seen=0.0, last_seen=0.0, packet_count=10)
+        
+        score = worker._quick_threat_check("1.2.3.4", tracker, _packet("tcp"), 0.0)
+        
+        features = worker._ml_predict.call_args[0][0]
+        assert isinstance(features, TrafficFeatures)
+        assert features.protocol_udp == 0.0
+        assert score == 15
+    
+    def test_detector_predict_runs_on_worker_features(self, worker):
+        """Real predict() should accept the worker's feature vector."""
+        worker._ml_predict = worker.ml.predict
+        tracker = IPTracker(first_seen=0.0, last_seen=0.0, packet_count=10)
+        
+        score = worker._quick_threat_check("1.2.3.4", tracker, _packet(), 0.0)
+        
+        assert 0 <= score <= 100
+        assert worker._ml_predict is not None
+
+
+class TestReceiveQueue:
+    """Receive thread -> packet loop handoff."""
+    
+    def test_overflow_counted(self, worker):
+        """Packets evicted from a full queue should be counted."""
+        worker._rx_queue = deque(maxlen=3)
+        
+        worker._enqueue_received([_packet()] * 2)
+        assert worker.rx_overflow == 0
+        
+        worker._enqueue_received([_packet()] * 4)
+        
+        assert len(worker._rx_queue) == 3
+        assert worker.rx_overflow == 3
+        assert worker._rx_ready.is_set()
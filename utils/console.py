@@ -6,6 +6,10 @@ Formatted console output with colors and progress bars.
 
 import sys
 
+# Prebuilt progress bars for the default width, indexed by filled cells
+BAR_WIDTH = 25
+_BARS = tuple("█" * i + "░" * (BAR_WIDTH - i) for i in range(BAR_WIDTH + 1))
+
 
 class Console:
     """
@@ -28,6 +32,8 @@ class Console:
     THROTTLE = f"{RED}[THROTTLE]{RESET}"
     ALERT = f"{RED}[!]{RESET}"
     INFO = f"{BLUE}[*]{RESET}"
+    FLOOD = f"{RED}[FLOOD]{RESET}"
+    _NO_DROPS = f"{GREEN}↓0{RESET}"
     
     @classmethod
     def supports_color(cls) -> bool:
@@ -58,16 +64,17 @@ class Console:
         print(f"{cls.INFO} Starting... Press Ctrl+C to stop.\n")
     
     @classmethod
-    def progress_bar(cls, value: float, max_value: float, width: int = 25) -> str:
+    def progress_bar(cls, value: float, max_value: float, width: int = BAR_WIDTH) -> str:
         """Create a progress bar string."""
         if max_value <= 0:
             ratio = 0
         else:
             ratio = min(value / max_value, 1.0)
         
-        filled = int(ratio * width)
-        bar = "█" * filled + "░" * (width - filled)
-        return bar
+        filled = max(0, int(ratio * width))
+        if width == BAR_WIDTH:
+            return _BARS[filled]
+        return "█" * filled + "░" * (width - filled)
     
     @classmethod
     def format_stats(cls, stats: dict) -> str:
@@ -78,7 +85,7 @@ class Console:
         
         # Status based on speed + flood mode
         if flood_mode:
-            status = f"{cls.RED}[FLOOD]{cls.RESET}"
+            status = cls.FLOOD
         elif speed > max_bw * 0.9:
             status = cls.THROTTLE
         elif speed > max_bw * 0.5:
@@ -98,7 +105,7 @@ class Console:
         if dropped > 0:
             drop_str = f"{cls.RED}↓{dropped}{cls.RESET}"
         else:
-            drop_str = f"{cls.GREEN}↓0{cls.RESET}"
+            drop_str = cls._NO_DROPS
         
         return (
             f"\r{status} {speed:6.2f}/{max_bw:.0f} MB/s [{bar}] "
@@ -8,7 +8,7 @@ Security Principle: Defense in Depth
     - Cannot intercept network traffic
     - Cannot modify packets
     - Cannot access privileged resources
-    
+
 Responsibilities:
     - ML-based anomaly detection
     - OSINT/Intel lookups (WHOIS, GeoIP)
@@ -26,9 +26,9 @@ import signal
 import logging
 import ctypes
 from typing import Optional, Dict
-from datetime import datetime
 from threading import Thread, Event
-from collections import defaultdict
+from collections import deque
+from itertools import islice
 from dataclasses import dataclass
 
 from .ipc import IPCClient, PacketData, Command, CommandType
@@ -47,7 +47,7 @@ except ImportError:
     logger.warning("Intel module not available")
 
 try:
-    from .ml import AnomalyDetector
+    from .ml import AnomalyDetector, FeatureExtractor
     ML_AVAILABLE = True
 except ImportError:
     ML_AVAILABLE = False
@@ -62,7 +62,22 @@ def is_admin() -> bool:
         return False
 
 
-@dataclass
+# Win32 thread priorities (winbase.h)
+THREAD_PRIORITY_BELOW_NORMAL = -1
+THREAD_PRIORITY_ABOVE_NORMAL = 1
+
+
+def set_thread_priority(priority: int) -> bool:
+    """Set the calling thread's Win32 priority. No-op elsewhere."""
+    try:
+        kernel32 = ctypes.windll.kernel32
+        thread = kernel32.GetCurrentThread()
+        return kernel32.SetThreadPriority(thread, priority) != 0
+    except:
+        return False
+
+
+@dataclass(slots=True)
 class IPTracker:
     """Lightweight IP tracking for threat analysis."""
     first_seen: float
@@ -72,8 +87,8 @@ class IPTracker:
     throttle_count: int = 0
     threat_score: int = 0
     
-    def update(self, size: int):
-        self.last_seen = time.time()
+    def update(self, size: int, now: float):
+        self.last_seen = now
         self.packet_count += 1
         self.byte_count += size
 
@@ -94,6 +109,9 @@ class Worker:
     ANALYSIS_INTERVAL = 0.5
     INTEL_LOOKUP_INTERVAL = 5.0
     LOG_INTERVAL = 1.0
+    RECEIVE_BATCH = 64  # Max packets drained from the pipe per read
+    RX_QUEUE_SIZE = 65536  # Received-but-unanalyzed packets (oldest dropped, counted)
+    HOT_IP_PACKETS = 100  # Packet count past which an IP gets intel lookups
     
     def __init__(self, config: NetShieldConfig):
         # Security check: warn if running as admin
@@ -110,6 +128,9 @@ class Worker:
         
         # IP tracking
         self.ip_trackers: Dict[str, IPTracker] = {}
+        # IPs past HOT_IP_PACKETS, in the order they crossed it (dict used
+        # as an ordered set): the intel loop reads this, not every tracker
+        self._hot_ips: Dict[str, None] = {}
         
         # Intel (WHOIS, threat feeds)
         if INTEL_AVAILABLE:
@@ -120,15 +141,35 @@ class Worker:
         # ML anomaly detector
         if ML_AVAILABLE:
             self.ml = AnomalyDetector()
+            self.ml_features = FeatureExtractor(config.high_risk_countries)
         else:
             self.ml = None
+            self.ml_features = None
+        
+        # Optional per-packet hooks, resolved once (not hasattr per packet)
+        self._intel_profiles = getattr(self.intel, 'profiles', None)
+        self._ml_predict = None
+        if self.ml is not None:
+            if self.ml.is_trained:
+                self._ml_predict = self.ml.predict
+            else:
+                # Untrained predict() only repeats rule-based heuristics
+                logger.warning("ML scoring disabled: anomaly model is not trained")
         
         # Logger
         self.logger = EventLogger(config.log_dir)
         
-        # Rate tracking (sliding window)
-        self.rate_samples: list = []
+        # Rate tracking (sliding window, oldest first)
+        self.rate_samples: deque = deque()
         self.rate_window = 1.0  # seconds
+        self._rate_bytes = 0  # running sum of sizes in rate_samples
+        
+        # Receive thread -> packet loop handoff. The pipe is drained even
+        # while analysis or a throttle send stalls, so the service's
+        # writes never back up; on overflow the oldest packets go.
+        self._rx_queue: deque = deque(maxlen=self.RX_QUEUE_SIZE)
+        self._rx_ready = Event()
+        self.rx_overflow = 0  # Packets evicted before analysis (receive thread only)
         
         # Background threads
         self.threads: list = []
@@ -157,11 +198,15 @@ class Worker:
         print("[+] Connected to admin service")
         self.running = True
         
-        # Start background threads
+        # Start background threads (including the pipe receiver)
         self._start_background_tasks()
         
         print("[*] Worker running. Press Ctrl+C to stop.")
         
+        # Throttle decisions are latency-sensitive: favour the packet
+        # loop over the intel/cleanup threads when the OS schedules them
+        set_thread_priority(THREAD_PRIORITY_ABOVE_NORMAL)
+        
         try:
             self._packet_loop()
         
@@ -171,34 +216,76 @@ class Worker:
         finally:
             self._shutdown()
     
-    def _packet_loop(self):
-        """Process packets from service."""
-        packet_count = 0
-        last_stats = time.time()
+    def _receive_loop(self):
+        """Drain the packet pipe into _rx_queue (I/O only, no analysis)."""
+        set_thread_priority(THREAD_PRIORITY_ABOVE_NORMAL)
+        receive = self.ipc.receive_packets
+        enqueue = self._enqueue_received
         
         while self.running and not self.stop_event.is_set():
-            # Receive packet metadata
-            packet = self.ipc.receive_packet()
+            # Receive packet metadata (first blocks, rest already buffered)
+            packets = receive(self.RECEIVE_BATCH)
             
-            if packet is None:
+            if not packets:
                 # Connection closed or error
                 if not self.running:
                     break
                 time.sleep(0.01)
                 continue
             
-            # Process packet
-            self._analyze_packet(packet)
-            packet_count += 1
+            enqueue(packets)
+    
+    def _enqueue_received(self, packets: list):
+        """Hand received packets to the packet loop, counting evictions."""
+        rx_queue = self._rx_queue
+        overflow = len(rx_queue) + len(packets) - rx_queue.maxlen
+        if overflow > 0:
+            self.rx_overflow += overflow  # extend() drops the oldest
+        rx_queue.extend(packets)
+        self._rx_ready.set()
+    
+    def _packet_loop(self):
+        """Process packets handed over by the receive thread."""
+        packet_count = 0
+        last_stats = time.time()
+        last_overflow = 0
+        # Hot-loop locals (avoid LOAD_ATTR per batch/packet)
+        rx_queue = self._rx_queue
+        pop = rx_queue.popleft
+        rx_ready = self._rx_ready
+        analyze = self._analyze_packet
+        batch_size = self.RECEIVE_BATCH
+        
+        while self.running and not self.stop_event.is_set():
+            if not rx_queue:
+                # Rechecked after clear(), so a set() racing it is not lost
+                rx_ready.wait(0.1)
+                rx_ready.clear()
+                continue
+            
+            # Process batch (one clock read shared by analysis and stats)
+            now = time.time()
+            count = min(len(rx_queue), batch_size)
+            for _ in range(count):
+                analyze(pop(), now)
+            packet_count += count
             
             # Periodic stats
-            if time.time() - last_stats > 5.0:
-                rate = packet_count / (time.time() - last_stats)
+            if now - last_stats > 5.0:
+                rate = packet_count / (now - last_stats)
                 logger.info(f"Processing rate: {rate:.1f} pkt/s")
                 packet_count = 0
-                last_stats = time.time()
+                last_stats = now
+                
+                overflow = self.rx_overflow
+                if overflow != last_overflow:
+                    logger.warning(
+                        f"Receive queue full: {overflow - last_overflow} packets "
+                        f"dropped before analysis ({overflow} total)"
+                    )
+                    last_overflow = overflow
     
-    def _analyze_packet(self, packet: PacketData):
+    def _analyze_packet(self, packet: PacketData, now: float):
         """
         Analyze packet for threats.
         
@@ -206,24 +293,26 @@ class Worker:
         Heavy analysis in background threads.
         """
         src_ip = packet.src_ip
-        now = time.time()
         
-        # Update IP tracker
-        if src_ip not in self.ip_trackers:
-            self.ip_trackers[src_ip] = IPTracker(
+        # Update IP tracker (one dict probe on the common, known-IP path)
+        tracker = self.ip_trackers.get(src_ip)
+        if tracker is None:
+            tracker = self.ip_trackers[src_ip] = IPTracker(
                 first_seen=now,
                 last_seen=now
             )
         
-        tracker = self.ip_trackers[src_ip]
-        tracker.update(packet.size)
+        tracker.update(packet.size, now)
+        if tracker.packet_count == self.HOT_IP_PACKETS + 1:
+            self._hot_ips[src_ip] = None
         
-        # Rate tracking
+        # Rate tracking (_get_rate_mbps expires old samples)
         self.rate_samples.append((now, packet.size))
-        self._cleanup_rate_samples()
+        self._rate_bytes += packet.size
         
         # Quick threat checks (fast path)
-        threat_score = self._quick_threat_check(src_ip, tracker, packet)
+        rate_mbps = self._get_rate_mbps(now)
+        threat_score = self._quick_threat_check(src_ip, tracker, packet, rate_mbps)
         
         if threat_score >= self.THREAT_SCORE_THRESHOLD:
             # Send throttle command to service
@@ -232,10 +321,10 @@ class Worker:
             
             # Log event
             event = ThreatEvent(
-                timestamp=datetime.now().isoformat(),
+                timestamp=time.time_ns(),  # formatted by logger thread
                 event_type="high_score",
                 ip=src_ip,
-                speed_mbps=self._get_ip_rate_mbps(src_ip),
+                speed_mbps=rate_mbps,
                 threat_score=threat_score,
                 details={
                     "packets": tracker.packet_count,
@@ -245,16 +334,18 @@ class Worker:
             self.logger.log_event(event)
     
     def _quick_threat_check(self, ip: str, tracker: IPTracker, 
-                            packet: PacketData) -> int:
+                            packet: PacketData, rate_mbps: float) -> int:
         """
         Quick threat assessment — runs per-packet.
         
+        Args:
+            rate_mbps: Current aggregate rate, computed once by _analyze_packet
+        
         Returns: threat score 0-100
         """
         score = 0
         
         # High packet rate
-        rate_mbps = self._get_ip_rate_mbps(ip)
         if rate_mbps > self.HIGH_RATE_THRESHOLD_MBPS:
             score += 40
         elif rate_mbps > self.HIGH_RATE_THRESHOLD_MBPS / 2:
@@ -265,54 +356,62 @@ class Worker:
             score += 20
         
         # Use cached intel if available
-        if self.intel and hasattr(self.intel, 'profiles'):
-            profile = self.intel.profiles.get(ip)
+        profile = None
+        if self._intel_profiles is not None:
+            profile = self._intel_profiles.get(ip)
             if profile:
                 score += profile.threat_score
         
-        # ML anomaly score (if trained)
-        if self.ml and hasattr(self.ml, 'predict_score'):
-            try:
-                features = [
-                    tracker.packet_count,
-                    tracker.byte_count,
-                    rate_mbps,
-                    tracker.throttle_count
-                ]
-                ml_score = self.ml.predict_score(features)
-                score += int(ml_score * 30)  # 0-30 from ML
-            except:
-                pass
+        # ML anomaly score (if trained; predict() falls back to rules on error)
+        if self._ml_predict is not None:
+            features = self.ml_features.extract_counts(
+                tracker.packet_count,
+                tracker.throttle_count,
+                profile.country if profile else "Unknown",
+                profile.asn_description if profile else "Unknown",
+                current_speed=rate_mbps,
+                max_bandwidth=self.config.max_bandwidth_mbps,
+                protocol=packet.protocol,
+            )
+            ml_score = self._ml_predict(features)
+            score += int(ml_score * 30)  # 0-30 from ML
         
         tracker.threat_score = min(100, score)
         return tracker.threat_score
     
-    def _get_ip_rate_mbps(self, ip: str) -> float:
-        """Get current rate for IP in MB/s."""
-        now = time.time()
-        cutoff = now - self.rate_window
-        
-        total_bytes = 0
-        for ts, size in self.rate_samples:
-            if ts >= cutoff:
-                total_bytes += size
-        
-        return (total_bytes / self.rate_window) / 1024 / 1024
+    def _get_rate_mbps(self, now: float) -> float:
+        """Get current aggregate rate (all sources) in MB/s."""
+        self._cleanup_rate_samples(now)
+        return (self._rate_bytes / self.rate_window) / 1024 / 1024
     
-    def _cleanup_rate_samples(self):
-        """Remove old rate samples."""
-        cutoff = time.time() - self.rate_window
-        self.rate_samples = [
-            (ts, size) for ts, size in self.rate_samples
-            if ts >= cutoff
-        ]
+    def _cleanup_rate_samples(self, now: float):
+        """
+        Remove old rate samples.
+        
+        Samples are appended in time order, so expired ones are all at
+        the left end: amortized O(1) per packet, no list rebuild.
+        """
+        samples = self.rate_samples
+        cutoff = now - self.rate_window
+        while samples and samples[0][0] < cutoff:
+            self._rate_bytes -= samples.popleft()[1]
         
         # Limit size
-        if len(self.rate_samples) > 10000:
-            self.rate_samples = self.rate_samples[-5000:]
+        if len(samples) > 10000:
+            while len(samples) > 5000:
+                self._rate_bytes -= samples.popleft()[1]
     
     def _start_background_tasks(self):
-        """Start background analysis threads."""
+        """Start background receive/analysis threads."""
+        
+        # Pipe receiver (feeds _packet_loop)
+        t = Thread(
+            target=self._receive_loop,
+            daemon=True,
+            name="Worker-Receive"
+        )
+        t.start()
+        self.threads.append(t)
         
         # Intel lookup thread
         if self.intel:
@@ -335,28 +434,27 @@ class Worker:
     
     def _intel_loop(self):
         """Background WHOIS/Intel lookups."""
+        set_thread_priority(THREAD_PRIORITY_BELOW_NORMAL)
         while self.running and not self.stop_event.is_set():
             try:
-                # Get IPs needing lookup
-                ips_to_check = [
-                    ip for ip, tracker in self.ip_trackers.items()
-                    if tracker.packet_count > 100  # Only high-traffic
-                ]
+                # Get IPs needing lookup (only high-traffic, batch of 10)
+                ips_to_check = list(islice(self._hot_ips, 10))
                 
-                for ip in ips_to_check[:10]:  # Batch of 10
+                for ip in ips_to_check:
                     if not self.running:
                         break
                     self.intel.get_or_create_profile(ip)
                     time.sleep(0.5)  # Rate limit
                 
                 time.sleep(self.INTEL_LOOKUP_INTERVAL)
-                
+            
             except Exception as e:
                 logger.exception(f"Intel loop error: {e}")
                 time.sleep(5.0)
     
     def _cleanup_loop(self):
         """Periodic cleanup of old data."""
+        set_thread_priority(THREAD_PRIORITY_BELOW_NORMAL)
         while self.running and not self.stop_event.is_set():
             try:
                 now = time.time()
@@ -368,12 +466,13 @@ class Worker:
                 ]
                 for ip in old_ips:
                     del self.ip_trackers[ip]
+                    self._hot_ips.pop(ip, None)
                 
                 if old_ips:
                     logger.info(f"Cleaned up {len(old_ips)} old IP trackers")
                 
                 time.sleep(300)  # Every 5 min
-                
+            
             except Exception as e:
                 logger.exception(f"Cleanup error: {e}")
                 time.sleep(60)
@@ -402,6 +501,8 @@ class Worker:
             if t.threat_score >= self.THREAT_SCORE_THRESHOLD
         )
         print(f"    High-threat IPs: {high_threat}")
+        if self.rx_overflow:
+            print(f"    Dropped before analysis (queue full): {self.rx_overflow:,}")
         
         logger.info("Worker shutdown complete")
 